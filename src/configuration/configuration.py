@@ -14,4 +14,5 @@ from . import urls as URLS
 """
 Environment file
 """
-ENV = load_dotenv(os.path.join(PATHS.PACKAGE_PATH, ".env"))
+load_dotenv(os.path.join(PATHS.PACKAGE_PATH, ".env"))
+ENV = os.environ
@@ -22,6 +22,30 @@ ENTITY_PROFILE = {
         "metadata": {
             "type": "json",
             "description": "Metadata of the model.",
+            "deferred": True
+        },
+        "normalized_metadata": {
+            "type": "json",
+            "description": "Normalized metadata of the model."
+        },
+        "name": {
+            "type": "str_180",
+            "description": "Name of the model, promoted from metadata.",
+            "index": True
+        },
+        "type": {
+            "type": "str",
+            "description": "Type of the model, promoted from metadata.",
+            "index": True
+        },
+        "base_model": {
+            "type": "str",
+            "description": "Base model of the model, promoted from metadata.",
+            "index": True
+        },
+        "trigger_words": {
+            "type": "text",
+            "description": "Comma-separated trigger words of the model, promoted from metadata.",
         },
         "api_url": {
             "type": "text",
@@ -30,18 +54,21 @@ ENTITY_PROFILE = {
         "source": {
             "type": "str",
             "description": "Metadata source.",
+            "index": True
         },
         "created": {
             "type": "datetime",
             "description": "Timestamp of creation.",
-            "post": "lambda _: datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')"
+            "post": "lambda _: datetime.datetime.now()",
+            "batch_shared": True
         },
         "updated": {
             "type": "datetime",
             "description": "Timestamp of last update.",
-            "post": "lambda _: datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')",
-            "patch": "lambda _: datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')",
-            "delete": "lambda _: datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')"
+            "post": "lambda _: datetime.datetime.now()",
+            "patch": "lambda _: datetime.datetime.now()",
+            "delete": "lambda _: datetime.datetime.now()",
+            "batch_shared": True
         },
         "inactive": {
             "type": "char",
@@ -65,6 +92,30 @@ ENTITY_PROFILE = {
         "metadata": {
             "type": "json",
             "description": "Metadata of the model version.",
+            "deferred": True
+        },
+        "normalized_metadata": {
+            "type": "json",
+            "description": "Normalized metadata of the model version."
+        },
+        "name": {
+            "type": "str_180",
+            "description": "Model name of the model version, promoted from metadata.",
+            "index": True
+        },
+        "type": {
+            "type": "str",
+            "description": "Model type of the model version, promoted from metadata.",
+            "index": True
+        },
+        "base_model": {
+            "type": "str",
+            "description": "Base model of the model version, promoted from metadata.",
+            "index": True
+        },
+        "trigger_words": {
+            "type": "text",
+            "description": "Comma-separated trigger words of the model version, promoted from metadata.",
         },
         "api_url": {
             "type": "text",
@@ -73,18 +124,22 @@ ENTITY_PROFILE = {
         "source": {
             "type": "str",
             "description": "Metadata source.",
+            "index": True
         },
         "created": {
             "type": "datetime",
             "description": "Timestamp of creation.",
-            "post": "lambda _: datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')"
+            "post": "lambda _: datetime.datetime.now()",
+            "batch_shared": True
         },
         "updated": {
             "type": "datetime",
             "description": "Timestamp of last update.",
-            "post": "lambda _: datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')",
-            "patch": "lambda _: datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')",
-            "delete": "lambda _: datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')"
+            "index": True,
+            "post": "lambda _: datetime.datetime.now()",
+            "patch": "lambda _: datetime.datetime.now()",
+            "delete": "lambda _: datetime.datetime.now()",
+            "batch_shared": True
         },
         "inactive": {
             "type": "char",
@@ -117,7 +172,32 @@ ENTITY_PROFILE = {
         },
         "sha256": {
             "type": "str",
-            "description": "SHA256 hash of the file."
+            "description": "SHA256 hash of the file.",
+            "index": True
+        },
+        "quick_hash": {
+            "type": "str",
+            "description": "SHA256 hash over the size and sampled blocks of the file."
+        },
+        "hash_status": {
+            "type": "str",
+            "description": "Status of the SHA256 hash of the file: 'pending' -> 'hashed'"
+        },
+        "device": {
+            "type": "bigint",
+            "description": "Device of the file at the time of hashing."
+        },
+        "inode": {
+            "type": "bigint",
+            "description": "Inode of the file at the time of hashing."
+        },
+        "size": {
+            "type": "bigint",
+            "description": "Size of the file in bytes at the time of hashing."
+        },
+        "mtime_ns": {
+            "type": "bigint",
+            "description": "Modification time of the file in nanoseconds at the time of hashing."
         },
         "status": {
             "type": "str",
@@ -128,14 +208,16 @@ ENTITY_PROFILE = {
         "created": {
             "type": "datetime",
             "description": "Timestamp of creation.",
-            "post": "lambda _: datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')"
+            "post": "lambda _: datetime.datetime.now()",
+            "batch_shared": True
         },
         "updated": {
             "type": "datetime",
             "description": "Timestamp of last update.",
-            "post": "lambda _: datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')",
-            "patch": "lambda _: datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')",
-            "delete": "lambda _: datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')"
+            "post": "lambda _: datetime.datetime.now()",
+            "patch": "lambda _: datetime.datetime.now()",
+            "delete": "lambda _: datetime.datetime.now()",
+            "batch_shared": True
         },
         "inactive": {
             "type": "char",
@@ -178,20 +260,22 @@ ENTITY_PROFILE = {
         "status": {
             "type": "str",
             "required": True,
-            "description": "Status of the model file: 'collected' -> 'downloaded'",
+            "description": "Status of the model file: 'collected' -> 'downloaded' | 'corrupted'",
             "post": "lambda _: 'collected'"
         },
         "created": {
             "type": "datetime",
             "description": "Timestamp of creation.",
-            "post": "lambda _: datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')"
+            "post": "lambda _: datetime.datetime.now()",
+            "batch_shared": True
         },
         "updated": {
             "type": "datetime",
             "description": "Timestamp of last update.",
-            "post": "lambda _: datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')",
-            "patch": "lambda _: datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')",
-            "delete": "lambda _: datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')"
+            "post": "lambda _: datetime.datetime.now()",
+            "patch": "lambda _: datetime.datetime.now()",
+            "delete": "lambda _: datetime.datetime.now()",
+            "batch_shared": True
         },
         "inactive": {
             "type": "char",
@@ -203,9 +287,9 @@ ENTITY_PROFILE = {
 
 LINKAGE_PROFILE = {
     "link": {
-        "source": "model_file",
-        "target": "model_version",
-        "relation": "1:1",
+        "source": "model_version",
+        "target": "model_file",
+        "relation": "1:n",
         "linkage_type": "foreign_key",
         "source_key": [
             "int",
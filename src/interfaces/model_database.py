@@ -5,13 +5,36 @@
 *            (c) 2023 Alexander Hering             *
 ****************************************************
 """
-from typing import List, Any
+import os
+import datetime
+from typing import List, Any, Tuple, Optional, Dict, Union, Iterator
+from sqlalchemy import or_, func, insert
 from src.configuration import configuration as cfg
 from src.configuration.model_database_config import ENTITY_PROFILE, LINKAGE_PROFILE, VIEW_PROFILE
 from src.utility.gold.sqlalchemy_entity_data_interface import SQLAlchemyEntityInterface as DBInterface
 from src.utility.gold.filter_mask import FilterMask
 
 
+# Normalized metadata fields, promoted to indexed columns of models and model versions
+INDEXED_METADATA_FIELDS = ["name", "type", "base_model", "trigger_words"]
+
+
+def extract_indexed_metadata(metadata: Optional[dict]) -> dict:
+    """
+    Function for extracting the values of indexed columns from normalized metadata.
+    :param metadata: Normalized metadata.
+    :return: Dictionary, mapping indexed columns to values.
+    """
+    metadata = metadata if metadata is not None else {}
+    indexed_metadata = {field: metadata.get(field) for field in INDEXED_METADATA_FIELDS}
+    if indexed_metadata["name"] is not None:
+        indexed_metadata["name"] = indexed_metadata["name"][:180]
+    if isinstance(indexed_metadata["trigger_words"], list):
+        indexed_metadata["trigger_words"] = ", ".join(
+            indexed_metadata["trigger_words"])
+    return indexed_metadata
+
+
 class ModelDatabase(DBInterface):
     """
     Class, representing ACA Database.
@@ -36,56 +59,210 @@ class ModelDatabase(DBInterface):
             linkage_profiles=LINKAGE_PROFILE,
             view_profiles=VIEW_PROFILE)
 
-    def get_tracked_model_files(self, model_folder: str = None, ignored_sub_folders: List[str] = [], ignored_model_files: List[str] = []) -> List[Any]:
+    def get_tracked_model_files(self, model_folder: str = None, ignored_sub_folders: List[str] = [], ignored_model_files: List[str] = [],
+                                attributes: List[str] = None, stream: bool = False, chunk_size: int = 1000) -> Union[List[Any], Iterator[Any]]:
         """
         Method for getting tracked model files.
-        :param model_folder: Model folder to fetch tracked model files for.
+        :param model_folder: Model folder to fetch tracked model files in it and its subfolders for.
             Defaults to None in which case all tracked files are returned.
         :param ignored_sub_folders: Subfolder parts to ignore.  
             Defaults to an empty list.
         :param ignored_model_files: Model files to ignore.  
             Defaults to an empty list.
-        :return: List of tracked model files.
+        :param attributes: Attributes to fetch.
+            Defaults to None in which case full model file objects are returned.
+        :param stream: Flag, declaring whether to stream tracked model files in chunks instead of fetching them at once.
+            Defaults to False.
+        :param chunk_size: Number of model files to fetch at once, if streaming.
+            Defaults to 1000.
+        :return: List of or iterator over tracked model files.
         """
-        filter_expressions = [["folder", "contains",
-                               model_folder]] if model_folder is not None else []
-        filter_expressions.extend(
-            [["folder", "not_contains", ignored] for ignored in ignored_sub_folders])
+        filter_expressions = [["folder", "not_contains", ignored]
+                              for ignored in ignored_sub_folders]
         filter_expressions.extend([["file_name", "!=", ignored]
                                   for ignored in ignored_model_files])
+        if model_folder is not None:
+            model_folder = os.path.normpath(model_folder)
+            list_of_filters = [[FilterMask([["folder", "==", model_folder], *filter_expressions])],
+                               [FilterMask([["folder", "startswith", os.path.join(model_folder, "")],
+                                            *[list(expression) for expression in filter_expressions]])]]
+        else:
+            list_of_filters = [[FilterMask(filter_expressions)]
+                               ] if filter_expressions else []
+
+        if stream:
+            return self.iter_get("model_file", list_of_filters, chunk_size=chunk_size, attributes=attributes)
+        return self._get_batch("model_file", list_of_filters, attributes=attributes)
+
+    def get_model_files_by_paths(self, paths: List[str], attributes: List[str] = None, chunk_size: int = 500) -> List[Any]:
+        """
+        Method for getting model files by their full paths.
+        :param paths: Full model file paths.
+        :param attributes: Attributes to fetch.
+            Defaults to None in which case full model file objects are returned.
+        :param chunk_size: Number of paths to query at once.
+            Defaults to 500.
+        :return: List of model files.
+        """
+        paths = list(paths)
+        model_files = []
+        for index in range(0, len(paths), chunk_size):
+            model_files.extend(self._get_batch("model_file", [[FilterMask([["folder", "==", os.path.dirname(path)],
+                                                                           ["file_name", "==", os.path.basename(path)]])]
+                                                              for path in paths[index:index+chunk_size]], attributes=attributes))
+        return model_files
+
+    def get_pending_model_files(self) -> List[Any]:
+        """
+        Method for getting model files with pending hashes.
+        :return: List of model files with pending hashes.
+        """
+        return self._get_batch("model_file", [[FilterMask([["hash_status", "==", "pending"]])]])
+
+    def get_assets(self, asset_type: str = None, folder: str = None, statuses: List[str] = None,
+                   attributes: List[str] = None) -> List[Any]:
+        """
+        Method for getting assets.
+        :param asset_type: Asset type to get.
+            Defaults to None in which case assets of all types are returned.
+        :param folder: Folder to get assets in it and its subfolders for.
+            Defaults to None in which case assets in all folders are returned.
+        :param statuses: Asset statuses to get.
+            Defaults to None in which case assets with any status are returned.
+        :param attributes: Attributes to fetch.
+            Defaults to None in which case full asset objects are returned.
+        :return: List of assets.
+        """
+        filter_expressions = [["type", "==", asset_type]
+                              ] if asset_type is not None else []
+        if folder is not None:
+            filter_expressions.append(
+                ["path", "startswith", os.path.join(os.path.normpath(folder), "")])
+        if statuses is not None:
+            filter_expressions.append(["status", "in", statuses])
+
+        return self._get_batch("asset", [[FilterMask(filter_expressions)]
+                                         ] if filter_expressions else [], attributes=attributes)
 
-        return self._get_batch("model_file", [FilterMask(filter_expressions)
-                                              ] if filter_expressions else [])
+    def update_asset_statuses(self, statuses: List[dict]) -> None:
+        """
+        Method for updating asset statuses in bulk.
+        :param statuses: List of dictionaries with "id" and "status" of the assets to update.
+        """
+        self._patch_batch("asset", statuses)
+
+    def update_asset_hashes(self, hashes: List[dict]) -> None:
+        """
+        Method for updating asset hashes in bulk.
+        :param hashes: List of dictionaries with "id" and "sha256" of the assets to update.
+        """
+        self._patch_batch("asset", hashes)
+
+    def get_stale_model_versions(self, source: str, updated_before: datetime.datetime, attributes: List[str] = None) -> List[Any]:
+        """
+        Method for getting model versions, whose metadata was not updated since a given time.
+        :param source: Metadata source.
+        :param updated_before: Time of last update.
+        :param attributes: Attributes to fetch.
+            Defaults to None in which case full model version objects are returned.
+        :return: List of stale model versions.
+        """
+        return self._get_batch("model_version", [[FilterMask([["source", "==", source], ["updated", "<", updated_before]])]],
+                               attributes=attributes)
+
+    def update_model_versions(self, patches: List[dict]) -> None:
+        """
+        Method for updating model versions in bulk.
+        :param patches: List of dictionaries with "id" and the attributes to update.
+        """
+        self._patch_batch("model_version", patches)
+
+    def get_duplicate_model_files(self, attributes: List[str] = None) -> Dict[str, List[Any]]:
+        """
+        Method for getting groups of active model files with the same SHA256 hash.
+        :param attributes: Attributes to fetch.
+            Defaults to None in which case full model file objects are returned.
+        :return: Dictionary, mapping SHA256 hashes to model files.
+        """
+        model_file = self.model["model_file"]
+        active = or_(model_file.inactive.is_(None), model_file.inactive != "X")
+        with self.session_factory() as session:
+            duplicate_hashes = session.query(model_file.sha256).filter(
+                model_file.sha256.isnot(None), active).group_by(model_file.sha256).having(func.count(model_file.id) > 1)
+            result = session.query(*self.get_query_targets("model_file", attributes)).filter(
+                model_file.sha256.in_(duplicate_hashes.scalar_subquery()), active).order_by(model_file.sha256, model_file.id).all()
+        groups = {}
+        for entry in result:
+            groups.setdefault(entry.sha256, []).append(entry)
+        return groups
+
+    def update_model_file_group(self, patches: List[dict]) -> None:
+        """
+        Method for updating a group of model files in a single transaction.
+        :param patches: List of dictionaries with "id" and the attributes to update.
+        """
+        self._patch_batch("model_file", patches, chunk_size=max(len(patches), 1))
 
     def get_unlinked_model_files(self, files: List[str] = None) -> List[Any]:
         """
         Method for getting unlinked model files.
+        Model files are unlinked, if they do not reference a model version.
         :param files: Files to get.
-            Defaults to None, in which case all unknown models are retrieved.
+            Defaults to None, in which case all unlinked model files are retrieved.
         :return: List of unlinked model files.
         """
-        filter_expressions = [["file_name", "in",
-                               files]] if files is not None else []
+        foreign_key = f"{self._linkage_profiles['link']['source']}_{self._linkage_profiles['link']['source_key'][1]}"
+        filter_expressions = [[foreign_key, "==", None]]
+        if files is not None:
+            filter_expressions.append(["file_name", "in", files])
 
-        return self._get_batch("model_file", [FilterMask(filter_expressions)
-                                              ] if filter_expressions else [])
+        return self._get_batch("model_file", [[FilterMask(filter_expressions)]])
 
     def link_model_file(self, model_file: Any, model_version_data: dict) -> None:
         """
         Method for linking model files.
         :param model_file: File to link.
         :param model_version_data: Model version data to link to model file.
-            Needs to include "source", "api_url" and "metadata".
+            Needs to include "source", "api_url", "metadata" and "normalized_metadata".
         """
-        model_version = self._get("model_version", [FilterMask(
-            [["api_url"], "==", model_version_data["api_url"]])])
-        if model_version:
-            model_version.metadata = model_version_data["metadata"]
-            self._patch("model_version", model_version)
-        else:
-            model_version = self._post(
-                "model_version", self.model["model_version"](**model_version_data))
+        self.link_model_files([(model_file, model_version_data)])
+
+    def link_model_files(self, linkages: List[Tuple[Any, dict]]) -> None:
+        """
+        Method for linking a batch of model files in one transaction.
+        Model versions are looked up by their API URL, existing ones are updated and missing ones are inserted.
+        The link is stored on the model files, so that duplicate model files can link the same model version.
+        :param linkages: List of tuples of model file and model version data.
+            Model version data needs to include "source", "api_url", "metadata" and "normalized_metadata".
+        """
+        if not linkages:
+            return
+        model_version = self.model["model_version"]
+        foreign_key = f"{self._linkage_profiles['link']['source']}_{self._linkage_profiles['link']['source_key'][1]}"
+        with self.session_factory() as session:
+            existing_versions = dict(session.query(model_version.api_url, model_version.id).filter(
+                model_version.api_url.in_({data["api_url"] for _, data in linkages})).all())
+            new_versions = {}
+            version_patches = {}
+            for _, model_version_data in linkages:
+                model_version_data = {**model_version_data, **extract_indexed_metadata(
+                    model_version_data["normalized_metadata"])}
+                if model_version_data["api_url"] in existing_versions:
+                    version_patches[model_version_data["api_url"]] = {"id": existing_versions[model_version_data["api_url"]],
+                                                                      **{key: model_version_data[key] for key in [
+                                                                          "metadata", "normalized_metadata", *INDEXED_METADATA_FIELDS]}}
+                else:
+                    new_versions[model_version_data["api_url"]] = model_version_data
 
-        self.link_entities("link", model_file, model_version)
-        model_file.status = "linked"
-        self._patch("model_file", model_file)
+            if new_versions:
+                session.execute(insert(model_version), self.set_defaults(
+                    "model_version", "post", list(new_versions.values()), True))
+                existing_versions.update(session.query(model_version.api_url, model_version.id).filter(
+                    model_version.api_url.in_(new_versions)).all())
+            if version_patches:
+                session.bulk_update_mappings(model_version, self.set_defaults(
+                    "model_version", "patch", list(version_patches.values()), True))
+            session.bulk_update_mappings(self.model["model_file"], self.set_defaults(
+                "model_file", "patch", [{"id": model_file.id, "status": "linked", foreign_key: existing_versions[data["api_url"]]}
+                                        for model_file, data in linkages], True))
+            session.commit()
@@ -7,12 +7,17 @@
 """
 import requests
 import json
-from time import sleep
-import shutil
 from logging import Logger
-from typing import Any, Optional, List
-from src.utility.silver import image_utility, internet_utility
+from typing import Any, Optional, List, Union, Tuple
+from concurrent.futures import Future
+from src.utility.bronze import requests_utility
+from src.utility.silver import image_utility
 from src.configuration import configuration as cfg
+from src.model.model_control import response_caches
+from src.model.model_control.response_caches import AbstractResponseCache
+from src.model.model_control import rate_limiters
+from src.model.model_control.rate_limiters import TokenBucketRateLimiter
+from src.model.model_control.download_managers import DownloadManager
 import abc
 
 
@@ -22,6 +27,95 @@ class AbstractAPIWrapper(abc.ABC):
     Such wrappers are used for connecting to model services.
     """
 
+    def __init__(self, response_cache: AbstractResponseCache = None, rate_limiter: TokenBucketRateLimiter = None,
+                 session: requests.Session = None, download_manager: DownloadManager = None, queue_path: str = None) -> None:
+        """
+        Initiation method.
+        Subclasses need to resume queued downloads via 'download_manager.resume' after configuring the download manager.
+        :param response_cache: Response cache for API requests.
+            Defaults to None in which case responses are not cached.
+        :param rate_limiter: Rate limiter for API requests, usually shared by all wrappers for the same host.
+            Defaults to None in which case requests are not rate limited.
+        :param session: Session for API requests, shared by all calls and threads of the wrapper.
+            Defaults to None in which case a pooled keep-alive session is created.
+        :param download_manager: Download manager for model and asset downloads.
+            Download managers without request function send their requests via the wrapper.
+            Defaults to None in which case a download manager is created.
+        :param queue_path: Path of the JSON file, persisting queued downloads of the created download manager.
+            Defaults to None in which case queued downloads are not persisted.
+        """
+        self.response_cache = response_cache
+        self.rate_limiter = rate_limiter
+        self.session = session if session is not None else requests_utility.get_pooled_session()
+        self.download_manager = download_manager if download_manager is not None else DownloadManager(
+            self.get_response, queue_path=queue_path)
+        if self.download_manager.request_function is None:
+            self.download_manager.request_function = self.get_response
+
+    def send_request(self, method: str, url: str, headers: dict = None, max_retries: int = 3, **kwargs: Optional[dict]) -> requests.Response:
+        """
+        Method for sending requests, respecting the rate limiter.
+        Rate limit responses block the rate limiter for the time, given by the Retry-After header, before retrying.
+        :param method: Request method.
+        :param url: URL.
+        :param headers: Request headers.
+            Defaults to None.
+        :param max_retries: Maximum number of retries after rate limit responses.
+            Defaults to 3.
+        :param kwargs: Arbitrary keyword arguments, passed on to the request.
+        :return: Response.
+        """
+        if self.rate_limiter is None:
+            return self.session.request(method, url, headers=headers, **kwargs)
+        for _ in range(max_retries):
+            self.rate_limiter.acquire()
+            resp = self.session.request(
+                method, url, headers=headers, **kwargs)
+            if not self.rate_limiter.handle_response(resp.status_code, resp.headers):
+                return resp
+            resp.close()
+        self.rate_limiter.acquire()
+        return self.session.request(method, url, headers=headers, **kwargs)
+
+    def get_response(self, url: str, headers: dict = None, max_retries: int = 3, **kwargs: Optional[dict]) -> requests.Response:
+        """
+        Method for sending GET requests, respecting the rate limiter.
+        :param url: URL.
+        :param headers: Request headers.
+            Defaults to None.
+        :param max_retries: Maximum number of retries after rate limit responses.
+            Defaults to 3.
+        :param kwargs: Arbitrary keyword arguments, passed on to the request.
+        :return: Response.
+        """
+        return self.send_request("GET", url, headers, max_retries, **kwargs)
+
+    def get_content(self, url: str, headers: dict = None) -> bytes:
+        """
+        Method for getting response content, utilizing the response cache if available.
+        Fresh cached responses are returned directly, stale ones are revalidated with a conditional request.
+        :param url: URL.
+        :param headers: Request headers.
+            Defaults to None.
+        :return: Response content.
+        """
+        if self.response_cache is None:
+            return self.get_response(url, headers=headers).content
+
+        auth_scope = response_caches.get_auth_scope(headers)
+        entry = self.response_cache.get(url, auth_scope)
+        if entry is not None and self.response_cache.is_fresh(url, entry):
+            return entry["content"]
+        resp = self.get_response(url, headers={
+                            **(headers or {}), **self.response_cache.get_conditional_headers(entry)})
+        if resp.status_code == 304 and entry is not None:
+            self.response_cache.revalidate(url, auth_scope, resp.headers)
+            return entry["content"]
+        if resp.status_code == 200:
+            self.response_cache.put(
+                url, auth_scope, resp.status_code, resp.headers, resp.content)
+        return resp.content
+
     @abc.abstractmethod
     def check_connection(self, *args: Optional[List], **kwargs: Optional[dict]) -> bool:
         """
@@ -56,6 +150,51 @@ class AbstractAPIWrapper(abc.ABC):
         """
         pass
 
+    def resolve_metadata(self, identifier: str, model_id: Any, *args: Optional[List], **kwargs: Optional[dict]) -> Tuple[Optional[dict], bool]:
+        """
+        Method for acquring model data by identifier and telling missing models apart from failed requests.
+        Wrappers, which can recognize not found responses, should override this method.
+        :param identifier: Type of identification.
+        :model_id: Identification of specified type.
+        :param args: Arbitrary arguments.
+        :param kwargs: Arbitrary keyword arguments.
+        :return: Tuple of metadata for given model ID, if found else None,
+            and a flag, declaring whether the source definitely does not know the model.
+        """
+        return self.collect_metadata(identifier, model_id, *args, **kwargs) or None, False
+
+    @abc.abstractmethod
+    def parse_api_url(self, api_url: str, *args: Optional[List], **kwargs: Optional[dict]) -> Tuple[str, Any]:
+        """
+        Abstract method for parsing an API URL into type of identification and identification.
+        :param api_url: API URL, see 'get_api_url'.
+        :param args: Arbitrary arguments.
+        :param kwargs: Arbitrary keyword arguments.
+        :return: Tuple of type of identification and identification.
+        """
+        pass
+
+    def resolve_metadata_batch(self, identifier: str, model_ids: List[Any], *args: Optional[List], **kwargs: Optional[dict]) -> Tuple[dict, List[Any]]:
+        """
+        Method for acquring model data for multiple identifications and telling missing models apart from failed requests.
+        Wrappers of sources, which support multi-ID queries, should override this method.
+        :param identifier: Type of identification.
+        :param model_ids: Identifications of specified type.
+        :param args: Arbitrary arguments.
+        :param kwargs: Arbitrary keyword arguments.
+        :return: Tuple of a dictionary, mapping identifications to metadata, if found,
+            and a list of identifications, which the source definitely does not know.
+        """
+        result = {}
+        not_found = []
+        for model_id in model_ids:
+            metadata, missing = self.resolve_metadata(identifier, model_id)
+            if metadata:
+                result[model_id] = metadata
+            elif missing:
+                not_found.append(model_id)
+        return result, not_found
+
     @abc.abstractmethod
     def normalize_metadata(self, metadata: dict, *args: Optional[List], **kwargs: Optional[dict]) -> dict:
         """
@@ -91,16 +230,38 @@ class CivitaiAbstractAPIWrapper(AbstractAPIWrapper):
     Class, representing civitai API wrapper.
     """
 
-    def __init__(self) -> None:
+    def __init__(self, response_cache: AbstractResponseCache = None, rate_limiter: TokenBucketRateLimiter = None,
+                 session: requests.Session = None, download_manager: DownloadManager = None, queue_path: str = None) -> None:
         """
         Initiation method.
+        :param response_cache: Response cache for API requests.
+            Defaults to None in which case responses are not cached.
+        :param rate_limiter: Rate limiter for API requests.
+            Defaults to None in which case the rate limiter, shared for the civitai host, is used.
+        :param session: Session for API requests.
+            Defaults to None in which case a pooled keep-alive session is created.
+        :param download_manager: Download manager for model and asset downloads.
+            Authorization headers are added to its headers, before its queued downloads are resumed.
+            Defaults to None in which case a download manager is created.
+        :param queue_path: Path of the JSON file, persisting queued downloads of the created download manager.
+            Defaults to None in which case queued downloads are not persisted.
         """
+        super().__init__(response_cache, rate_limiter if rate_limiter is not None else rate_limiters.get_rate_limiter(
+            "https://civitai.com/"), session, download_manager, queue_path)
         self._logger = Logger("[CivitaiAbstractAPIWrapper]")
         self.authorization = cfg.ENV["CIVITAI_API_KEY"]
+        self.download_manager.headers["Authorization"] = self.authorization
         self.base_url = "https://civitai.com/"
         self.api_base_url = "https://civitai.com/api/v1/"
         self.model_by_versionhash_url = "https://civitai.com/api/v1/model-versions/by-hash/"
         self.model_by_id_url = "https://civitai.com/api/v1/models/"
+        if self.response_cache is not None:
+            # Model versions are rarely changed after release, model pages collect new versions and stats
+            self.response_cache.freshness_rules.setdefault(
+                self.model_by_versionhash_url, 7 * 86400.0)
+            self.response_cache.freshness_rules.setdefault(
+                self.model_by_id_url, 86400.0)
+        self.download_manager.resume()
 
     def check_connection(self, *args: Optional[List], **kwargs: Optional[dict]) -> bool:
         """
@@ -109,7 +270,7 @@ class CivitaiAbstractAPIWrapper(AbstractAPIWrapper):
         :param kwargs: Arbitrary keyword arguments.
         :return: True if connection was established successfuly else False.
         """
-        result = requests.get(self.base_url).status_code == 200
+        result = self.get_response(self.base_url).status_code == 200
         self._logger.info("Connection was successfuly established.") if result else self._logger.warn(
             "Connection could not be established.")
         return result
@@ -134,38 +295,150 @@ class CivitaiAbstractAPIWrapper(AbstractAPIWrapper):
         :param kwargs: Arbitrary keyword arguments.
         :return: Metadata for given model ID.
         """
+        return self.resolve_metadata(identifier, model_id)[0] or {}
+
+    def resolve_metadata(self, identifier: str, model_id: Any, *args: Optional[List], **kwargs: Optional[dict]) -> Tuple[Optional[dict], bool]:
+        """
+        Method for acquring model data by identifier and telling missing models apart from failed requests.
+        Only error responses, stating that the model was not found, are considered a definite miss,
+        failed authorization, exhausted rate limits and undeserializable responses are not.
+        :param identifier: Type of identification.
+        :model_id: Identification of specified type.
+        :param args: Arbitrary arguments.
+        :param kwargs: Arbitrary keyword arguments.
+        :return: Tuple of metadata for given model ID, if found else None,
+            and a flag, declaring whether the source definitely does not know the model.
+        """
         self._logger.info(
             f"Fetching metadata for model with '{model_id}' as '{identifier}'...")
-        resp = requests.get(self.get_api_url(identifier, model_id), headers={
-                            "Authorization": self.authorization})
+        content = self.get_content(self.get_api_url(identifier, model_id), headers={
+                                   "Authorization": self.authorization})
         try:
-            meta_data = json.loads(resp.content)
-            if meta_data is not None and not "error" in meta_data:
-                self._logger.info(f"Fetching metadata was successful.")
-                return meta_data
-            else:
-                self._logger.warn(f"Fetching metadata failed.")
+            meta_data = json.loads(content)
         except json.JSONDecodeError:
-            self._logger.warn(f"Metadata response could not be deserialized.")
-            return {}
+            self._logger.warning("Metadata response could not be deserialized.")
+            return None, False
+        if isinstance(meta_data, dict) and "error" not in meta_data:
+            self._logger.info("Fetching metadata was successful.")
+            return meta_data, False
+        not_found = isinstance(meta_data, dict) and "not found" in str(
+            meta_data["error"]).lower()
+        self._logger.warning(
+            "Model was not found." if not_found else "Fetching metadata failed.")
+        return None, not_found
+
+    def parse_api_url(self, api_url: str, *args: Optional[List], **kwargs: Optional[dict]) -> Tuple[str, Any]:
+        """
+        Method for parsing an API URL into type of identification and identification.
+        :param api_url: API URL, see 'get_api_url'.
+        :param args: Arbitrary arguments.
+        :param kwargs: Arbitrary keyword arguments.
+        :return: Tuple of type of identification and identification.
+        """
+        if api_url.startswith(self.model_by_versionhash_url):
+            return "hash", api_url[len(self.model_by_versionhash_url):]
+        return "id", api_url[len(self.model_by_id_url):]
+
+    def resolve_metadata_batch(self, identifier: str, model_ids: List[Any], *args: Optional[List], **kwargs: Optional[dict]) -> Tuple[dict, List[Any]]:
+        """
+        Method for acquring model data for multiple identifications and telling missing models apart from failed requests.
+        Model versions are fetched by hash with a single request.
+        Hashes, which are not contained in a successful response, are considered a definite miss.
+        :param identifier: Type of identification.
+        :param model_ids: Identifications of specified type.
+        :param args: Arbitrary arguments.
+        :param kwargs: Arbitrary keyword arguments.
+        :return: Tuple of a dictionary, mapping identifications to metadata, if found,
+            and a list of identifications, which the source definitely does not know.
+        """
+        if identifier != "hash":
+            return super().resolve_metadata_batch(identifier, model_ids)
+        self._logger.info(
+            f"Fetching metadata for {len(model_ids)} model versions by hash...")
+        resp = self.send_request("POST", self.model_by_versionhash_url.rstrip("/"), headers={
+                                 "Authorization": self.authorization}, json=[str(model_id) for model_id in model_ids])
+        try:
+            versions = json.loads(resp.content)
+        except json.JSONDecodeError:
+            self._logger.warning("Metadata response could not be deserialized.")
+            return {}, []
+        if not isinstance(versions, list):
+            self._logger.warning("Fetching metadata failed.")
+            return {}, []
+        requested = {str(model_id).upper(): model_id for model_id in model_ids}
+        result = {}
+        for version in versions:
+            for file in version.get("files", []):
+                file_hash = file.get("hashes", {}).get("SHA256", "").upper()
+                if file_hash in requested:
+                    result[requested[file_hash]] = version
+        return result, [model_id for model_id in model_ids if model_id not in result]
 
     def normalize_metadata(self, metadata: dict, **kwargs: Optional[dict]) -> dict:
         """
         Method for normalizing metadata.
+        Model and model version responses are reduced to a compact record, containing the fields "name", "type",
+        "base_model" and "trigger_words", which are promoted to indexed columns, and further commonly used fields.
         :param metadata: Metadata.
         :param kwargs: Arbitrary keyword arguments.
         :return: Normalized metadata.
         """
-        # TODO: Implement, once common metadata format is planned out.
-        pass
+        if not metadata:
+            return {}
+        if "modelVersions" in metadata:
+            versions = metadata["modelVersions"] or [{}]
+            return {
+                "name": metadata.get("name"),
+                "type": metadata.get("type"),
+                "base_model": versions[0].get("baseModel"),
+                "trigger_words": versions[0].get("trainedWords", []),
+                "model_id": metadata.get("id"),
+                "nsfw": metadata.get("nsfw", False),
+                "tags": metadata.get("tags", []),
+                "creator": (metadata.get("creator") or {}).get("username"),
+                "versions": [{"version_id": version.get("id"), "version_name": version.get("name"),
+                              "base_model": version.get("baseModel")} for version in metadata["modelVersions"]]
+            }
+        model = metadata.get("model") or {}
+        return {
+            "name": model.get("name"),
+            "type": model.get("type"),
+            "base_model": metadata.get("baseModel"),
+            "trigger_words": metadata.get("trainedWords", []),
+            "model_id": metadata.get("modelId"),
+            "version_id": metadata.get("id"),
+            "version_name": metadata.get("name"),
+            "nsfw": model.get("nsfw", False),
+            "updated_at": metadata.get("updatedAt"),
+            "download_url": metadata.get("downloadUrl"),
+            "files": [{"name": file.get("name"), "sha256": (file.get("hashes") or {}).get("SHA256"),
+                       "size_kb": file.get("sizeKB"), "primary": file.get("primary", False),
+                       "download_url": file.get("downloadUrl")} for file in metadata.get("files", [])],
+            "images": [{"url": image.get("url"), "width": image.get("width"), "height": image.get("height"),
+                        "nsfw": image.get("nsfw")} for image in metadata.get("images", [])]
+        }
 
-    def download_model(self, *args: Optional[List], **kwargs: Optional[dict]) -> None:
+    def download_model(self, url: str, output_path: str, expected_sha256: str = None, background: bool = False) -> Union[bool, Future]:
         """
-        Abstract method for downloading a model.
-        :param args: Arbitrary arguments.
-        :param kwargs: Arbitrary keyword arguments.
+        Method for downloading a model.
+        Interrupted downloads are resumed on the next call.
+        :param url: Model file URL.
+        :param output_path: Output path.
+        :param expected_sha256: Expected SHA256 hash.
+            Defaults to None in which case the hash is not checked.
+        :param background: Flag for queueing the download in the download manager instead of waiting for it.
+            Defaults to False.
+        :return: Future, resolving to the download result in background mode,
+            else True, if process was successful, else False.
         """
-        pass
+        if background:
+            return self.download_manager.enqueue(url, output_path, expected_sha256)
+        try:
+            self.download_manager.download(url, output_path, expected_sha256)
+            return True
+        except Exception as ex:
+            self._logger.warning(f"Downloading '{url}' failed: {ex}")
+            return False
 
     def download_asset(self, asset_type: str, url: str, output_path: str) -> bool:
         """
@@ -176,9 +449,8 @@ class CivitaiAbstractAPIWrapper(AbstractAPIWrapper):
         :return: True, if process was successful, else False.
         """
         if asset_type == "image":
-            return self.downloading_image(url, output_path)
+            return self.download_image(url, output_path)
 
-    @internet_utility.timeout(360.0)
     def download_image(self, url: str, output_path: str) -> bool:
         """
         Method for downloading images to disk.
@@ -186,13 +458,10 @@ class CivitaiAbstractAPIWrapper(AbstractAPIWrapper):
         :param output_path: Output path.
         :return: True, if process was successful, else False.
         """
-        sleep(2)
-        download = requests.get(url, stream=True, headers={
-                                "Authorization": self.authorization})
-        with open(output_path, 'wb') as file:
-            shutil.copyfileobj(download.raw, file)
-        del download
-        if image_utility.check_image_health(output_path):
+        try:
+            self.download_manager.download(
+                url, output_path, validator_factory=image_utility.StreamingImageValidator)
             return True
-        else:
+        except Exception as ex:
+            self._logger.warning(f"Downloading '{url}' failed: {ex}")
             return False
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+"""
+****************************************************
+*           aura-cognitive-architecture            *
+*            (c) 2023 Alexander Hering             *
+****************************************************
+"""
+import os
+import hashlib
+from threading import Lock
+from logging import Logger
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Optional, Callable, Dict, List
+from src.utility.bronze import json_utility, requests_utility
+
+
+class DownloadManager(object):
+    """
+    Class, representing a download manager for model files and assets.
+    Downloads are streamed into temporary ".part" files, which are resumed via HTTP Range requests and
+    atomically moved to their output path once complete. The SHA256 hash is calculated while streaming.
+    Queued downloads are handled by a bounded worker pool and persisted, so that they survive restarts.
+    Persisted downloads are restarted with 'resume', once the manager is configured.
+    """
+
+    def __init__(self, request_function: Callable = None, headers: dict = None, queue_path: str = None, workers: int = 4,
+                 chunk_size: int = 1024*1024) -> None:
+        """
+        Initiation method.
+        :param request_function: Function for sending GET requests, taking the URL, headers and request keyword arguments.
+            Defaults to None in which case the request function of the API wrapper, using the manager, is set
+            or the shared pooled session is used.
+        :param headers: Headers to send with every request, e.g. for authorization.
+            Headers are not persisted with queued downloads.
+            Defaults to None.
+        :param queue_path: Path of the JSON file, persisting queued downloads.
+            Persisted downloads are loaded, but only restarted with 'resume'.
+            Defaults to None in which case queued downloads are not persisted.
+        :param workers: Maximum number of concurrent downloads.
+            Defaults to 4.
+        :param chunk_size: Size of streamed chunks in bytes.
+            Defaults to 1 MiB.
+        """
+        self._logger = Logger("[DownloadManager]")
+        self.request_function = request_function
+        self.headers = headers if headers is not None else {}
+        self.queue_path = queue_path
+        self.chunk_size = chunk_size
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._queue_lock = Lock()
+        self._futures: Dict[str, Future] = {}
+        self._queue: Dict[str, dict] = {}
+        if self.queue_path is not None and os.path.exists(self.queue_path):
+            self._queue = json_utility.load(self.queue_path)
+            self._logger.info(
+                f"Loaded {len(self._queue)} queued downloads from '{self.queue_path}'.")
+
+    def resume(self) -> List[Future]:
+        """
+        Method for restarting queued downloads, which are not running, e.g. persisted or failed downloads.
+        Needs to be called after the manager is configured, since headers and request function are not persisted.
+        :return: Futures of restarted downloads.
+        """
+        with self._queue_lock:
+            jobs = [job for output_path, job in self._queue.items()
+                    if output_path not in self._futures or self._futures[output_path].done()]
+            if jobs:
+                self._logger.info(f"Resuming {len(jobs)} queued downloads.")
+            return [self._submit(job) for job in jobs]
+
+    def download(self, url: str, output_path: str, expected_sha256: str = None, validator_factory: Callable = None) -> dict:
+        """
+        Method for downloading a file, resuming a previous partial download if available.
+        :param url: URL.
+        :param output_path: Output path.
+        :param expected_sha256: Expected SHA256 hash.
+            Defaults to None in which case the hash is not checked.
+        :param validator_factory: Factory for validators, which are fed with the data while streaming,
+            see 'image_utility.StreamingImageValidator'. Invalid downloads are discarded before being moved to the output path.
+            Defaults to None in which case the data is not validated.
+        :return: Dictionary with "path", "size" and "sha256" of the downloaded file.
+        :raises ValueError: If the hash of the downloaded file does not match the expected hash or the validation failed.
+        :raises requests.RequestException: If the download failed.
+        """
+        part_path = output_path + ".part"
+        if os.path.dirname(output_path):
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        hasher = hashlib.sha256()
+        validator = validator_factory() if validator_factory is not None else None
+        offset = 0
+        if os.path.exists(part_path):
+            with open(part_path, "rb") as part_file:
+                for chunk in iter(lambda: part_file.read(self.chunk_size), b""):
+                    hasher.update(chunk)
+                    if validator is not None:
+                        self._validate(validator.feed, chunk, url, part_path)
+                    offset += len(chunk)
+
+        headers = {**self.headers, "Range": f"bytes={offset}-"} if offset else self.headers
+        request_function = self.request_function if self.request_function is not None else requests_utility.get_shared_session().get
+        with request_function(url, headers=headers, stream=True) as resp:
+            if offset and resp.status_code == 416:
+                # Partial file is already complete or outdated, restart to be sure
+                os.remove(part_path)
+                return self.download(url, output_path, expected_sha256, validator_factory)
+            resp.raise_for_status()
+            if offset and resp.status_code != 206:
+                self._logger.info(
+                    f"'{url}' does not support resuming, restarting download.")
+                hasher = hashlib.sha256()
+                validator = validator_factory() if validator_factory is not None else None
+                offset = 0
+            with open(part_path, "ab" if offset else "wb") as part_file:
+                for chunk in resp.iter_content(chunk_size=self.chunk_size):
+                    if validator is not None:
+                        self._validate(validator.feed, chunk, url, part_path)
+                    part_file.write(chunk)
+                    hasher.update(chunk)
+                    offset += len(chunk)
+
+        if validator is not None:
+            self._validate(validator.close, None, url, part_path)
+
+        sha256 = hasher.hexdigest()
+        if expected_sha256 is not None and sha256.lower() != expected_sha256.lower():
+            os.remove(part_path)
+            raise ValueError(
+                f"Hash of '{url}' does not match: expected '{expected_sha256}', got '{sha256}'.")
+        os.replace(part_path, output_path)
+        self._logger.info(f"Downloaded '{url}' to '{output_path}'.")
+        return {"path": output_path, "size": offset, "sha256": sha256}
+
+    def _validate(self, validation_function: Callable, data: Optional[bytes], url: str, part_path: str) -> None:
+        """
+        Internal method for running a validation step and discarding the partial download, if it fails.
+        :param validation_function: Validation function.
+        :param data: Data to pass to the validation function, or None if the function takes no arguments.
+        :param url: URL.
+        :param part_path: Partial download path.
+        :raises ValueError: If the validation failed.
+        """
+        try:
+            validation_function() if data is None else validation_function(data)
+        except Exception as ex:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            raise ValueError(f"Validation of '{url}' failed: {ex}")
+
+    def enqueue(self, url: str, output_path: str, expected_sha256: str = None) -> Future:
+        """
+        Method for queueing a download.
+        :param url: URL.
+        :param output_path: Output path.
+        :param expected_sha256: Expected SHA256 hash.
+            Defaults to None in which case the hash is not checked.
+        :return: Future, resolving to the download result, see 'download'.
+        """
+        job = {"url": url, "output_path": output_path,
+               "expected_sha256": expected_sha256}
+        with self._queue_lock:
+            if output_path in self._futures and not self._futures[output_path].done():
+                return self._futures[output_path]
+            self._queue[output_path] = job
+            self._save_queue()
+            return self._submit(job)
+
+    def _submit(self, job: dict) -> Future:
+        """
+        Internal method for submitting a queued download to the worker pool.
+        :param job: Download job.
+        :return: Future, resolving to the download result.
+        """
+        future = self._executor.submit(self._run, job)
+        self._futures[job["output_path"]] = future
+        return future
+
+    def _run(self, job: dict) -> dict:
+        """
+        Internal method for running a queued download.
+        Successful downloads are removed from the queue, failed downloads stay queued for the next resumption.
+        :param job: Download job.
+        :return: Download result.
+        """
+        try:
+            result = self.download(
+                job["url"], job["output_path"], job["expected_sha256"])
+        except Exception as ex:
+            self._logger.warning(f"Downloading '{job['url']}' failed: {ex}")
+            raise
+        with self._queue_lock:
+            self._queue.pop(job["output_path"], None)
+            self._save_queue()
+        return result
+
+    def _save_queue(self) -> None:
+        """
+        Internal method for persisting the download queue.
+        Needs to be called while holding the queue lock.
+        """
+        if self.queue_path is not None:
+            if os.path.dirname(self.queue_path):
+                os.makedirs(os.path.dirname(self.queue_path), exist_ok=True)
+            json_utility.save(self._queue, self.queue_path + ".tmp")
+            os.replace(self.queue_path + ".tmp", self.queue_path)
+
+    def get_queued_downloads(self) -> Dict[str, dict]:
+        """
+        Method for getting queued downloads.
+        :return: Dictionary, mapping output paths to download jobs.
+        """
+        with self._queue_lock:
+            return dict(self._queue)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Method for shutting down the worker pool.
+        Unfinished downloads stay queued for the next resumption.
+        :param wait: Flag for waiting for running downloads to finish.
+            Defaults to True.
+        """
+        self._executor.shutdown(wait=wait, cancel_futures=True)
@@ -5,14 +5,43 @@
 *            (c) 2023 Alexander Hering             *
 ****************************************************
 """
-from typing import Any, Optional, List, Tuple
+from typing import Any, Optional, List, Tuple, Iterator, Iterable, Dict
 import abc
 from src.configuration import configuration as cfg
 import os
+import datetime
+from time import time
+from queue import Queue, Full, Empty
+from threading import Thread, Event, Lock
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor, wait, as_completed, FIRST_COMPLETED
 from logging import Logger
 import copy
 from src.utility.bronze import json_utility, hashing_utility, dictionary_utility
-from src.interfaces.model_database import ModelDatabase
+from src.utility.silver import file_system_utility, environment_utility, image_utility
+from src.interfaces.model_database import ModelDatabase, extract_indexed_metadata
+from src.model.model_control.thumbnail_caches import ThumbnailCache
+
+
+# Model file fields, holding the fingerprint of the file at the time of hashing
+FINGERPRINT_FIELDS = ("device", "inode", "size", "mtime_ns")
+# Model file fields, needed for tracking model files
+TRACKING_FIELDS = ["id", "folder", "file_name", "sha256", "quick_hash", "inactive", *FINGERPRINT_FIELDS]
+# Extensions of Stable Diffusion model files
+MODEL_FILE_EXTENSIONS = (".safetensors", ".ckpt", ".pt", ".pth", ".bin")
+
+
+def hash_model_file(file_path: str, defer_full_hash: bool = False) -> dict:
+    """
+    Function for hashing model files.
+    :param file_path: Model file path.
+    :param defer_full_hash: Flag for only calculating the quick hash and marking the full hash as pending.
+        Defaults to False.
+    :return: Model file hash data.
+    """
+    return {
+        "quick_hash": hashing_utility.hash_with_sampling(file_path),
+        "sha256": None if defer_full_hash else hashing_utility.hash_with_multiple_digests(file_path, ["sha256"])["sha256"]
+    }
 
 
 class AbstractModelHandler(object):
@@ -30,7 +59,7 @@ class AbstractModelHandler(object):
         :param cache: Cache to initialize handler with.
             Defaults to None in which case an empty cache is created.
         """
-        self._logger = Logger["ModelHandler"]
+        self._logger = Logger("[ModelHandler]")
         self._db = db_interface
         self._apis = api_wrapper_dict
         self._cache = cache if cache is not None else {}
@@ -102,73 +131,763 @@ class StabeDiffusionModelHandler(AbstractModelHandler):
     Class, representing Model Handler for Stable Diffusion models.
     """
 
-    def __init__(self, db_interface: ModelDatabase, api_wrapper_dict: dict) -> None:
+    def __init__(self, db_interface: ModelDatabase, api_wrapper_dict: dict, cache: dict = None,
+                 negative_cache_ttl: float = 86400.0, negative_cache_max_ttl: float = 2592000.0,
+                 thumbnail_cache: ThumbnailCache = None) -> None:
         """
         Initiation method.
         :param db_interface: Entity Data Interface.
         :param api_wrapper_dict: Dictionary, mapping source to API wrapper.
+        :param cache: Cache to initialize handler with.
+            Defaults to None in which case an empty cache is created.
+        :param negative_cache_ttl: Time in seconds, for which a hash without a match at a source is not queried again.
+            The time is doubled with every further miss.
+            Defaults to 86400.0 (one day).
+        :param negative_cache_max_ttl: Maximum time in seconds, for which a hash without a match at a source is not queried again.
+            Defaults to 2592000.0 (30 days).
+        :param thumbnail_cache: Thumbnail cache for image assets.
+            Defaults to None in which case thumbnails are not available.
         """
-        super().__init__(db_interface, api_wrapper_dict)
-        self._logger = Logger["StabeDiffusionModelHandler"]
+        super().__init__(db_interface, api_wrapper_dict, cache)
+        self._logger = Logger("[StabeDiffusionModelHandler]")
+        self.negative_cache_ttl = negative_cache_ttl
+        self.negative_cache_max_ttl = negative_cache_max_ttl
+        self._cache_lock = Lock()
+        self.thumbnail_cache = thumbnail_cache
 
-    def load_model_folder(self, model_folder: str, ignored_sub_folders: List[str] = [], ignored_model_files: List[str] = []) -> None:
+    def extract_model_files(self, files: List[str]) -> List[str]:
+        """
+        Method for extracting model files.
+        :param files: File names or paths.
+        :return: Model files.
+        """
+        return [file for file in files if file.lower().endswith(MODEL_FILE_EXTENSIONS)]
+
+    def load_model_folder(self, model_folder: str, ignored_sub_folders: List[str] = [], ignored_model_files: List[str] = [],
+                          parallel: bool = False, workers: int = None, use_processes: bool = False, queue_size: int = 64,
+                          defer_full_hash: bool = False, chunk_size: int = 500) -> dict:
         """
         Method for loading model folder.
+        Model files, which can not be hashed, are logged, counted and skipped.
         :param model_folder: Model folder to load.
         :param ignored_sub_folders: Subfolder parts to ignore.  
             Defaults to an empty list.
         :param ignored_model_files: Model files to ignore.  
             Defaults to an empty list.
+        :param parallel: Flag for overlapping folder walking, hashing and database insertion.
+            Defaults to False in which case files are handled one after another.
+        :param workers: Number of hashing workers in parallel mode.
+            Defaults to None in which case the CPU count is used.
+        :param use_processes: Flag for hashing with a process pool instead of a thread pool in parallel mode.
+            Defaults to False.
+        :param queue_size: Maximum number of entries, buffered between the stages in parallel mode.
+            Defaults to 64.
+        :param defer_full_hash: Flag for only calculating quick hashes and marking full SHA256 hashes as pending.
+            Pending hashes can be calculated with 'hash_pending_model_files'.
+            Defaults to False.
+        :param chunk_size: Number of newly found or changed model files to insert or update per transaction.
+            Defaults to 500.
+        :return: Report with numbers of tracked and failed model files.
         """
         self._logger.info(f"Loading model folders under '{model_folder}'...")
-        already_tracked_files = self._db.get_tracked_model_files(
+        report = {"tracked": 0, "failed": 0}
+        path_index, fingerprint_index = self._get_tracking_indices(
             model_folder, ignored_sub_folders, ignored_model_files)
+        changed_files = self._discover_changed_model_files(
+            model_folder, ignored_sub_folders, ignored_model_files, path_index, fingerprint_index)
+        if parallel:
+            self._track_model_files_in_parallel(
+                changed_files, report, workers, use_processes, queue_size, defer_full_hash, chunk_size)
+        else:
+            new_model_files = []
+            model_file_patches = []
+            for root, model_file, fingerprint, hashes, tracked_model in changed_files:
+                if hashes is None:
+                    try:
+                        hashes = hash_model_file(
+                            os.path.join(root, model_file), defer_full_hash)
+                    except OSError as ex:
+                        self._log_hashing_failure(
+                            os.path.join(root, model_file), ex, report)
+                        continue
+                self._track_model_file(root, model_file, fingerprint, hashes,
+                                       tracked_model, new_model_files, model_file_patches)
+                report["tracked"] += 1
+                if len(new_model_files) + len(model_file_patches) >= chunk_size:
+                    self._flush_model_files(
+                        new_model_files, model_file_patches)
+            self._flush_model_files(new_model_files, model_file_patches)
+        return report
+
+    def _log_hashing_failure(self, file_path: str, exception: Exception, report: dict) -> None:
+        """
+        Internal method for logging and counting a model file, which could not be hashed.
+        :param file_path: Model file path.
+        :param exception: Hashing exception.
+        :param report: Report to update.
+        """
+        self._logger.warning(
+            f"Hashing '{file_path}' failed with '{exception}', skipping.")
+        report["failed"] += 1
+
+    def _get_tracking_indices(self, model_folder: str, ignored_sub_folders: List[str], ignored_model_files: List[str]) -> Tuple[dict, dict]:
+        """
+        Internal method for getting indices over active tracked model files.
+        :param model_folder: Model folder to get tracked model files for.
+        :param ignored_sub_folders: Subfolder parts to ignore.
+        :param ignored_model_files: Model files to ignore.
+        :return: Dictionary, mapping full paths to tracked model files and
+            dictionary, mapping stored fingerprints to tracked model files.
+        """
+        path_index = {}
+        fingerprint_index = {}
+        tracked_count = 0
+        for model in self._db.get_tracked_model_files(
+                model_folder, ignored_sub_folders, ignored_model_files, attributes=TRACKING_FIELDS, stream=True):
+            tracked_count += 1
+            if model.inactive == "X":
+                continue
+            path_index[os.path.join(model.folder, model.file_name)] = model
+            stored_fingerprint = self._get_stored_fingerprint(model)
+            if stored_fingerprint is not None:
+                fingerprint_index[stored_fingerprint] = model
         self._logger.info(
-            f"Found {len(already_tracked_files)} already tracked files...")
+            f"Found {tracked_count} already tracked files...")
+        return path_index, fingerprint_index
 
-        for root, _, files in os.walk(model_folder, topdown=True):
-            self._logger.info(f"Checking '{root}'...")
+    def _get_stored_fingerprint(self, model: Any) -> Optional[Tuple[int, int, int, int]]:
+        """
+        Internal method for getting the stored fingerprint of a tracked model file.
+        :param model: Model file object.
+        :return: Tuple of device, inode, size and modification time in nanoseconds if stored, else None.
+        """
+        fingerprint = tuple(getattr(model, field, None)
+                            for field in FINGERPRINT_FIELDS)
+        return None if None in fingerprint else fingerprint
+
+    def _discover_changed_model_files(self, model_folder: str, ignored_sub_folders: List[str], ignored_model_files: List[str],
+                                      path_index: dict, fingerprint_index: dict) -> Iterator[Tuple[str, str, tuple, Optional[dict], Any]]:
+        """
+        Internal method for discovering untracked and changed model files.
+        Files, whose fingerprint is already known, are not marked for hashing, even if they were renamed or moved.
+        :param model_folder: Model folder to load.
+        :param ignored_sub_folders: Subfolder parts to ignore.
+        :param ignored_model_files: Model files to ignore.
+        :param path_index: Dictionary, mapping full paths to tracked model files.
+        :param fingerprint_index: Dictionary, mapping stored fingerprints to tracked model files.
+        :return: Iterator over tuples of root folder, file name, current fingerprint, known hash data and
+            the tracked model file to update. The hash data is None, if the file needs to be hashed.
+            The tracked model file is None, if a new model file needs to be tracked.
+        """
+        moved_models = set()
+        current_root = None
+        for entry in file_system_utility.walk_files(model_folder, ignored_sub_folders):
+            root = os.path.dirname(entry.path)
+            if root != current_root:
+                current_root = root
+                self._logger.info(f"Checking '{root}'...")
+            if self.extract_model_files([entry.name]):
+                self._logger.info(f"Found '{entry.name}'.")
+                try:
+                    change = self._classify_model_file(
+                        root, entry.name, ignored_model_files, path_index, fingerprint_index, moved_models, entry.stat())
+                except FileNotFoundError:
+                    self._logger.info(f"'{entry.path}' vanished, skipping.")
+                    continue
+                if change is not None:
+                    yield change
+
+    def _is_ignored_folder(self, model_folder: str, root: str, ignored_sub_folders: List[str]) -> bool:
+        """
+        Internal method for checking whether a folder under the model folder is ignored.
+        :param model_folder: Model folder.
+        :param root: Folder to check.
+        :param ignored_sub_folders: Subfolder parts to ignore.
+        :return: True, if folder is ignored, else False.
+        """
+        return any(subfolder in ignored_sub_folders for subfolder in root.replace(
+            model_folder, "").split("/"))
 
-            if any(subfolder in ignored_sub_folders for subfolder in root.replace(
-                    model_folder, "").split("/")):
-                self._logger.info(f"Ignoring '{root}'.")
+    def _classify_model_file(self, root: str, model_file: str, ignored_model_files: List[str], path_index: dict,
+                             fingerprint_index: dict, moved_models: set, stat_result: os.stat_result = None) -> Optional[Tuple[str, str, tuple, Optional[dict], Any]]:
+        """
+        Internal method for classifying a found model file against the tracked model files.
+        :param root: Root folder of the model file.
+        :param model_file: Model file name.
+        :param ignored_model_files: Model files to ignore.
+        :param path_index: Dictionary, mapping full paths to tracked model files.
+        :param fingerprint_index: Dictionary, mapping stored fingerprints to tracked model files.
+        :param moved_models: IDs of tracked model files, which were already identified as moved.
+            Newly identified moves are added.
+        :param stat_result: Stat result of the model file.
+            Defaults to None in which case the model file is stat'ed.
+        :return: Tuple of root folder, file name, current fingerprint, known hash data and the tracked model file
+            to update, if the model file needs to be tracked, else None.
+        """
+        full_model_path = os.path.join(root, model_file)
+        fingerprint = file_system_utility.get_file_fingerprint(
+            full_model_path, stat_result)
+        tracked_model = path_index.get(full_model_path)
+        if tracked_model is None:
+            if model_file not in ignored_model_files:
+                known_model = fingerprint_index.get(fingerprint)
+                if known_model is None or known_model.sha256 is None:
+                    self._logger.info(
+                        f"'{model_file}' is not tracked, collecting data...")
+                    return root, model_file, fingerprint, None, None
+                elif known_model.id not in moved_models and not os.path.exists(
+                        os.path.join(known_model.folder, known_model.file_name)):
+                    self._logger.info(
+                        f"'{model_file}' was moved from '{known_model.folder}'.")
+                    moved_models.add(known_model.id)
+                    return root, model_file, fingerprint, self._get_stored_hashes(known_model), known_model
+                else:
+                    self._logger.info(
+                        f"'{model_file}' is not tracked, but its fingerprint is known.")
+                    return root, model_file, fingerprint, self._get_stored_hashes(known_model), None
             else:
-                for model_file in self.extract_model_files(files):
-                    self._logger.info(f"Found '{model_file}'.")
-                    full_model_path = os.path.join(root, model_file)
-                    if not any(os.path.join(model.folder, model.file_name) == full_model_path for model in already_tracked_files):
-                        if model_file not in ignored_model_files:
-                            self._logger.info(
-                                f"'{model_file}' is not tracked, collecting data...")
-
-                            data = {
-                                "file_name": model_file,
-                                "folder": root,
-                                "sha256": hashing_utility.hash_with_sha256(os.path.join(root, model_file))
-                            }
-                            self._db._post(
-                                "model_file", self._db.model["model_file"](**data))
-
-                        else:
-                            self._logger.info(f"Ignoring '{model_file}'.")
-                    else:
+                self._logger.info(f"Ignoring '{model_file}'.")
+        else:
+            stored_fingerprint = self._get_stored_fingerprint(
+                tracked_model)
+            if stored_fingerprint is None and tracked_model.sha256 is not None:
+                self._logger.info(
+                    f"'{model_file}' is already tracked, storing fingerprint...")
+                return root, model_file, fingerprint, self._get_stored_hashes(tracked_model), tracked_model
+            elif stored_fingerprint != fingerprint:
+                self._logger.info(
+                    f"'{model_file}' is already tracked, but changed, collecting data...")
+                return root, model_file, fingerprint, None, tracked_model
+            else:
+                self._logger.info(
+                    f"'{model_file}' is already tracked.")
+
+    def _get_stored_hashes(self, model: Any) -> dict:
+        """
+        Internal method for getting the stored hash data of a tracked model file.
+        :param model: Model file object.
+        :return: Model file hash data.
+        """
+        return {"quick_hash": model.quick_hash, "sha256": model.sha256}
+
+    def _track_model_file(self, root: str, model_file: str, fingerprint: Tuple[int, int, int, int], hashes: dict,
+                          tracked_model: Any, new_model_files: List[dict], model_file_patches: List[dict]) -> None:
+        """
+        Internal method for tracking a model file.
+        :param root: Root folder of the model file.
+        :param model_file: Model file name.
+        :param fingerprint: Current fingerprint of the model file.
+        :param hashes: Model file hash data.
+        :param tracked_model: Tracked model file to update.
+            None, if a new model file is tracked.
+        :param new_model_files: List of new model file data to append new model files to.
+        :param model_file_patches: List of model file patches to append updates of tracked model files to.
+        """
+        data = {
+            "file_name": model_file,
+            "folder": root,
+            "hash_status": "pending" if hashes["sha256"] is None else "hashed",
+            **hashes,
+            **dict(zip(FINGERPRINT_FIELDS, fingerprint))
+        }
+        if tracked_model is None:
+            new_model_files.append(data)
+        else:
+            model_file_patches.append({"id": tracked_model.id, **data})
+
+    def _flush_model_files(self, new_model_files: List[dict], model_file_patches: List[dict]) -> None:
+        """
+        Internal method for inserting new model files and updating tracked model files in bulk.
+        :param new_model_files: List of new model file data. The list is emptied afterwards.
+        :param model_file_patches: List of model file patches, containing the model file ID. The list is emptied afterwards.
+        """
+        if new_model_files:
+            self._logger.info(
+                f"Inserting {len(new_model_files)} new model files...")
+            self._db._post_batch("model_file", new_model_files,
+                                 chunk_size=len(new_model_files))
+            new_model_files.clear()
+        if model_file_patches:
+            self._logger.info(
+                f"Updating {len(model_file_patches)} tracked model files...")
+            self._db._patch_batch("model_file", model_file_patches,
+                                  chunk_size=len(model_file_patches))
+            model_file_patches.clear()
+
+    def _track_model_files_in_parallel(self, changed_files: Iterator[Tuple[str, str, tuple, Optional[dict], Any]], report: dict, workers: int = None,
+                                       use_processes: bool = False, queue_size: int = 64, defer_full_hash: bool = False,
+                                       chunk_size: int = 500) -> None:
+        """
+        Internal method for hashing and tracking model files in a pipeline.
+        Walking, hashing and database insertion run as separate stages, connected by bounded queues.
+        Database insertion stays on the calling thread.
+        Exceptions in the walking stage and non-OS exceptions in the hashing stage are re-raised on the calling thread.
+        :param changed_files: Iterator over tuples of root folder, file name, current fingerprint, known hash data and
+            the tracked model file to update.
+        :param report: Report with numbers of tracked and failed model files to update.
+        :param workers: Number of hashing workers.
+            Defaults to None in which case the CPU count is used.
+        :param use_processes: Flag for hashing with a process pool instead of a thread pool.
+            Defaults to False.
+        :param queue_size: Maximum number of entries, buffered between the stages.
+            Defaults to 64.
+        :param defer_full_hash: Flag for only calculating quick hashes and marking full SHA256 hashes as pending.
+            Defaults to False.
+        :param chunk_size: Number of newly found or changed model files to insert or update per transaction.
+            Defaults to 500.
+        """
+        workers = workers or os.cpu_count() or 1
+        path_queue = Queue(maxsize=queue_size)
+        result_queue = Queue(maxsize=queue_size)
+        stop = Event()
+        errors = []
+
+        def put(queue: Queue, item: Any) -> bool:
+            """
+            Function for putting items into a bounded queue without blocking a stopped pipeline.
+            :param queue: Target queue.
+            :param item: Item to put.
+            :return: True, if item was put into queue, else False.
+            """
+            while not stop.is_set():
+                try:
+                    queue.put(item, timeout=0.1)
+                    return True
+                except Full:
+                    pass
+            return False
+
+        def walk() -> None:
+            """
+            Function for running the walking stage.
+            """
+            try:
+                for entry in changed_files:
+                    if not put(path_queue, entry):
+                        break
+            except Exception as ex:
+                errors.append(ex)
+            finally:
+                put(path_queue, None)
+
+        def dispatch(executor: Executor) -> None:
+            """
+            Function for running the hashing stage.
+            :param executor: Hashing executor.
+            """
+            in_flight = {}
+            try:
+                while not stop.is_set():
+                    try:
+                        entry = path_queue.get(timeout=0.1)
+                    except Empty:
+                        continue
+                    if entry is None:
+                        break
+                    if entry[3] is not None:
+                        if not put(result_queue, (entry, None)):
+                            return
+                        continue
+                    in_flight[executor.submit(hash_model_file, os.path.join(
+                        entry[0], entry[1]), defer_full_hash)] = entry
+                    if len(in_flight) >= queue_size:
+                        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            if not put(result_queue, (in_flight.pop(future), future)):
+                                return
+                for future in as_completed(in_flight):
+                    if not put(result_queue, (in_flight[future], future)):
+                        return
+            except Exception as ex:
+                errors.append(ex)
+            finally:
+                put(result_queue, None)
+
+        executor = ProcessPoolExecutor(
+            max_workers=workers) if use_processes else ThreadPoolExecutor(max_workers=workers)
+        walker = Thread(target=walk, daemon=True)
+        dispatcher = Thread(target=dispatch, args=(executor,), daemon=True)
+        walker.start()
+        dispatcher.start()
+        new_model_files = []
+        model_file_patches = []
+        try:
+            while True:
+                result = result_queue.get()
+                if result is None:
+                    break
+                (root, model_file, fingerprint, hashes, tracked_model), future = result
+                if future is not None:
+                    try:
+                        hashes = future.result()
+                    except OSError as ex:
+                        self._log_hashing_failure(
+                            os.path.join(root, model_file), ex, report)
+                        continue
+                self._track_model_file(root, model_file, fingerprint, hashes,
+                                       tracked_model, new_model_files, model_file_patches)
+                report["tracked"] += 1
+                if len(new_model_files) + len(model_file_patches) >= chunk_size:
+                    self._flush_model_files(
+                        new_model_files, model_file_patches)
+            if errors:
+                raise errors[0]
+            self._flush_model_files(new_model_files, model_file_patches)
+        finally:
+            stop.set()
+            executor.shutdown(wait=True, cancel_futures=True)
+            walker.join()
+            dispatcher.join()
+
+    def watch_model_folder(self, model_folder: str, ignored_sub_folders: List[str] = [], ignored_model_files: List[str] = [],
+                           poll_interval: float = 5.0, settle_time: float = 30.0, use_inotify: bool = True,
+                           stop_event: Event = None, max_pending_changes: int = 100000, resync_interval: float = None) -> None:
+        """
+        Method for continuously tracking a model folder until the stop event is set.
+        After an initial folder load, only changed files are hashed and inserted, moved or marked inactive.
+        Changes are collected from inotify events via the 'watchdog' package, if available, or by comparing folder snapshots.
+        Changed files are only handled after no further change was registered for the settle time,
+        so that partially copied files are not hashed.
+        Tracked model files are indexed in memory and the indices are updated with every handled change.
+        They are only rebuilt on a full resync, after too many pending changes or after the resync interval.
+        :param model_folder: Model folder to watch.
+        :param ignored_sub_folders: Subfolder parts to ignore.
+            Defaults to an empty list.
+        :param ignored_model_files: Model files to ignore.
+            Defaults to an empty list.
+        :param poll_interval: Interval in seconds for checking for settled changes and taking folder snapshots.
+            Defaults to 5.0.
+        :param settle_time: Time in seconds without further changes, after which a changed file is handled.
+            Defaults to 30.0.
+        :param use_inotify: Flag for using inotify events if available.
+            Defaults to True.
+        :param stop_event: Event for stopping the watch.
+            Defaults to None in which case the watch runs until interrupted.
+        :param max_pending_changes: Number of pending changes, above which changes are considered lost
+            and the model folder is fully resynchronized.
+            Defaults to 100000.
+        :param resync_interval: Interval in seconds for fully resynchronizing the model folder.
+            Defaults to None in which case the model folder is only resynchronized on too many pending changes.
+        """
+        stop_event = Event() if stop_event is None else stop_event
+        self.load_model_folder(
+            model_folder, ignored_sub_folders, ignored_model_files)
+        path_index, fingerprint_index = self._get_tracking_indices(
+            model_folder, ignored_sub_folders, ignored_model_files)
+        last_resync = time()
+
+        pending_changes = {}
+        lock = Lock()
+
+        def register_change(path: str) -> None:
+            """
+            Function for registering a change.
+            :param path: Changed path.
+            """
+            with lock:
+                pending_changes[path] = time()
+
+        observer = None
+        snapshot = None
+        if use_inotify and environment_utility.check_module_availability("watchdog"):
+            from watchdog.observers import Observer
+            from watchdog.events import FileSystemEventHandler
+
+            class ModelFolderEventHandler(FileSystemEventHandler):
+                """
+                Class, representing a watchdog event handler, registering changes of files.
+                """
+
+                def on_any_event(self, event: Any) -> None:
+                    """
+                    Method for handling file system events.
+                    Only events, which change the content or location of files, are registered.
+                    :param event: File system event.
+                    """
+                    if not event.is_directory and event.event_type in ("created", "modified", "moved", "deleted"):
+                        register_change(event.src_path)
+                        if getattr(event, "dest_path", None):
+                            register_change(event.dest_path)
+
+            observer = Observer()
+            observer.schedule(ModelFolderEventHandler(),
+                              model_folder, recursive=True)
+            observer.start()
+            self._logger.info(f"Watching '{model_folder}' via inotify...")
+        else:
+            snapshot = file_system_utility.get_folder_snapshot(
+                model_folder, ignored_sub_folders)
+            self._logger.info(f"Watching '{model_folder}' via polling...")
+
+        try:
+            while not stop_event.wait(poll_interval):
+                if observer is None:
+                    new_snapshot = file_system_utility.get_folder_snapshot(
+                        model_folder, ignored_sub_folders)
+                    for path in file_system_utility.get_snapshot_changes(snapshot, new_snapshot):
+                        register_change(path)
+                    snapshot = new_snapshot
+
+                now = time()
+                with lock:
+                    overflow = len(pending_changes) > max_pending_changes
+                    if overflow:
+                        pending_changes.clear()
+                if overflow or (resync_interval is not None and now - last_resync >= resync_interval):
+                    self._logger.info(
+                        f"Resynchronizing '{model_folder}'{' after too many changes' if overflow else ''}...")
+                    self.load_model_folder(
+                        model_folder, ignored_sub_folders, ignored_model_files)
+                    path_index, fingerprint_index = self._get_tracking_indices(
+                        model_folder, ignored_sub_folders, ignored_model_files)
+                    last_resync = now
+                    continue
+
+                with lock:
+                    settled_paths = [
+                        path for path in pending_changes if now - pending_changes[path] >= settle_time]
+                    for path in settled_paths:
+                        pending_changes.pop(path)
+                if settled_paths:
+                    self._sync_model_file_paths(
+                        model_folder, ignored_sub_folders, ignored_model_files, settled_paths, path_index, fingerprint_index)
+        finally:
+            if observer is not None:
+                observer.stop()
+                observer.join()
+
+    def _sync_model_file_paths(self, model_folder: str, ignored_sub_folders: List[str], ignored_model_files: List[str],
+                               paths: List[str], path_index: dict, fingerprint_index: dict) -> None:
+        """
+        Internal method for synchronizing tracked model files with the current state of changed paths.
+        :param model_folder: Model folder.
+        :param ignored_sub_folders: Subfolder parts to ignore.
+        :param ignored_model_files: Model files to ignore.
+        :param paths: Changed paths.
+        :param path_index: Dictionary, mapping full paths to tracked model files, see '_get_tracking_indices'.
+            The index is updated with the synchronized model files.
+        :param fingerprint_index: Dictionary, mapping stored fingerprints to tracked model files, see '_get_tracking_indices'.
+            The index is updated with the synchronized model files.
+        """
+        changed_paths = set(paths)
+        moved_models = set()
+        new_model_files = []
+        model_file_patches = []
+        for path in sorted(path for path in paths if os.path.isfile(path)):
+            root, model_file = os.path.split(path)
+            if self._is_ignored_folder(model_folder, root, ignored_sub_folders) or not self.extract_model_files([model_file]):
+                continue
+            self._logger.info(f"Found '{model_file}'.")
+            try:
+                change = self._classify_model_file(
+                    root, model_file, ignored_model_files, path_index, fingerprint_index, moved_models)
+                if change is not None:
+                    root, model_file, fingerprint, hashes, tracked_model = change
+                    self._track_model_file(root, model_file, fingerprint, hashes or hash_model_file(
+                        path), tracked_model, new_model_files, model_file_patches)
+                    if tracked_model is not None:
+                        changed_paths.add(os.path.join(
+                            tracked_model.folder, tracked_model.file_name))
+            except FileNotFoundError:
+                self._logger.info(f"'{path}' vanished, skipping.")
+        self._flush_model_files(new_model_files, model_file_patches)
+
+        for path in paths:
+            tracked_model = path_index.get(path)
+            if tracked_model is not None and tracked_model.id not in moved_models and not os.path.exists(path):
+                self._logger.info(
+                    f"'{path}' was removed, marking as inactive.")
+                model_file_patches.append(
+                    {"id": tracked_model.id, "inactive": "X"})
+        self._flush_model_files([], model_file_patches)
+        self._update_tracking_indices(
+            changed_paths, path_index, fingerprint_index)
+
+    def _update_tracking_indices(self, paths: Iterable[str], path_index: dict, fingerprint_index: dict) -> None:
+        """
+        Internal method for updating indices over active tracked model files with the stored state of the given paths.
+        :param paths: Full paths of changed model files.
+        :param path_index: Dictionary, mapping full paths to tracked model files.
+        :param fingerprint_index: Dictionary, mapping stored fingerprints to tracked model files.
+        """
+        for path in paths:
+            model = path_index.pop(path, None)
+            stored_fingerprint = None if model is None else self._get_stored_fingerprint(model)
+            if stored_fingerprint is not None and getattr(fingerprint_index.get(stored_fingerprint), "id", None) == model.id:
+                fingerprint_index.pop(stored_fingerprint)
+        for model in self._db.get_model_files_by_paths(paths, attributes=TRACKING_FIELDS):
+            if model.inactive == "X":
+                continue
+            path_index[os.path.join(model.folder, model.file_name)] = model
+            stored_fingerprint = self._get_stored_fingerprint(model)
+            if stored_fingerprint is not None:
+                fingerprint_index[stored_fingerprint] = model
+
+    def hash_pending_model_files(self, workers: int = None, use_processes: bool = False, background: bool = False,
+                                 chunk_size: int = 500) -> Optional[Thread]:
+        """
+        Method for calculating pending full SHA256 hashes of model files.
+        Model files, which changed since their quick hash was calculated or could not be hashed,
+        are skipped and left to the next folder scan.
+        :param workers: Number of hashing workers.
+            Defaults to None in which case the CPU count is used.
+        :param use_processes: Flag for hashing with a process pool instead of a thread pool.
+            Defaults to False.
+        :param background: Flag for calculating hashes in a background thread.
+            Defaults to False.
+        :param chunk_size: Number of calculated hashes to update per transaction.
+            Defaults to 500.
+        :return: Background thread, if hashes are calculated in the background, else None.
+        """
+        if background:
+            thread = Thread(target=self.hash_pending_model_files, args=(
+                workers, use_processes, False, chunk_size), daemon=True)
+            thread.start()
+            return thread
+
+        pending_files = self._db.get_pending_model_files()
+        self._logger.info(
+            f"Found {len(pending_files)} model files with pending hashes...")
+        workers = workers or os.cpu_count() or 1
+        model_file_patches = []
+        with (ProcessPoolExecutor(max_workers=workers) if use_processes else ThreadPoolExecutor(max_workers=workers)) as executor:
+            futures = {executor.submit(hashing_utility.hash_with_multiple_digests, os.path.join(
+                model.folder, model.file_name), ["sha256"]): model for model in pending_files}
+            for future in as_completed(futures):
+                model = futures[future]
+                full_model_path = os.path.join(model.folder, model.file_name)
+                try:
+                    hashes = future.result()
+                    if self._get_stored_fingerprint(model) != file_system_utility.get_file_fingerprint(full_model_path):
                         self._logger.info(
-                            f"'{model_file}' is already tracked.")
+                            f"'{full_model_path}' changed since it was found, skipping.")
+                        continue
+                except Exception as ex:
+                    self._logger.warning(
+                        f"Hashing '{full_model_path}' failed with '{ex}', skipping.")
+                    continue
+                self._logger.info(f"Calculated hash for '{full_model_path}'.")
+                model_file_patches.append(
+                    {"id": model.id, "sha256": hashes["sha256"], "hash_status": "hashed"})
+                if len(model_file_patches) >= chunk_size:
+                    self._flush_model_files([], model_file_patches)
+        self._flush_model_files([], model_file_patches)
 
-    def link_model_file(self, files: List[str] = None) -> None:
+    def link_model_file(self, files: List[str] = None, concurrent: bool = False, workers_per_source: int = 4,
+                        batch_size: int = 50) -> None:
         """
         Method for linking model files.
+        Model files with pending hashes are skipped.
+        Sources are not queried for known misses until their TTL expires, see 'is_known_miss'.
         :param files: Files to link.
             Defaults to None, in which case all unknown models are linked.
+        :param concurrent: Flag for resolving linkages concurrently.
+            Defaults to False in which case model files are resolved one after another.
+        :param workers_per_source: Maximum number of concurrent requests per source in concurrent mode.
+            Defaults to 4.
+        :param batch_size: Number of resolved linkages, written to the database at once in concurrent mode.
+            Defaults to 50.
         """
+        unlinked_model_files = []
         for unkown_model in self._db.get_unlinked_model_files(files):
-            linkage = self.calculate_linkage(unkown_model)
-            if linkage is not None:
-                self._db.link_model_file(unkown_model, {
-                    "source": linkage[0],
-                    "api_url": linkage[1],
-                    "metadata": linkage[2]
-                })
+            if unkown_model.sha256 is None:
+                self._logger.info(
+                    f"Hash of '{unkown_model.file_name}' is pending, skipping.")
+            else:
+                unlinked_model_files.append(unkown_model)
+
+        if concurrent:
+            self._link_model_files_concurrently(
+                unlinked_model_files, workers_per_source, batch_size)
+        else:
+            for unkown_model in unlinked_model_files:
+                linkage = self.calculate_linkage(unkown_model)
+                if linkage is not None:
+                    self._db.link_model_file(
+                        unkown_model, self._get_model_version_data(linkage))
+
+    def _get_model_version_data(self, linkage: Tuple[str, str, dict]) -> dict:
+        """
+        Internal method for converting a linkage into model version data.
+        :param linkage: Tuple of source and API URL and metadata.
+        :return: Model version data with the raw and the normalized metadata.
+        """
+        return {
+            "source": linkage[0],
+            "api_url": linkage[1],
+            "metadata": linkage[2],
+            "normalized_metadata": self._apis[linkage[0]].normalize_metadata(linkage[2])
+        }
+
+    def _link_model_files_concurrently(self, model_files: List[Any], workers_per_source: int, batch_size: int) -> None:
+        """
+        Internal method for resolving and linking model files concurrently.
+        Every source gets its own bounded executor, so that a slow source does not starve the others.
+        Resolved linkages are written to the database in batches from the calling thread.
+        :param model_files: Model files to link.
+        :param workers_per_source: Maximum number of concurrent requests per source.
+        :param batch_size: Number of resolved linkages, written to the database at once.
+        """
+        if not model_files or not self._apis:
+            return
+        source_executors = {source: ThreadPoolExecutor(
+            max_workers=workers_per_source) for source in self._apis}
+        file_executor = ThreadPoolExecutor(
+            max_workers=workers_per_source * len(self._apis))
+        linkages = []
+        try:
+            futures = {file_executor.submit(self._calculate_linkage_concurrently, model_file, source_executors): model_file
+                       for model_file in model_files}
+            for future in as_completed(futures):
+                linkage = future.result()
+                if linkage is not None:
+                    linkages.append(
+                        (futures[future], self._get_model_version_data(linkage)))
+                if len(linkages) >= batch_size:
+                    self._link_model_file_batch(linkages)
+            self._link_model_file_batch(linkages)
+        finally:
+            file_executor.shutdown(wait=True, cancel_futures=True)
+            for source_executor in source_executors.values():
+                source_executor.shutdown(wait=True, cancel_futures=True)
+
+    def _calculate_linkage_concurrently(self, model_file: Any, source_executors: Dict[str, Executor]) -> Optional[Tuple[str, str, dict]]:
+        """
+        Internal method for calculating source linkage by querying all sources in parallel.
+        The first hit in source priority order is returned, pending requests to lower priority sources are cancelled.
+        :param model_file: Model file object.
+        :param source_executors: Dictionary, mapping source to executor.
+        :return: Tuple of source and API URL and metadata if found else None.
+        """
+        futures = {source: source_executors[source].submit(
+            self._apis[source].resolve_metadata, "hash", model_file.sha256) for source in self._apis
+            if not self.is_known_miss(source, model_file.sha256)}
+        for source in futures:
+            try:
+                metadata, not_found = futures[source].result()
+            except Exception as ex:
+                self._logger.warning(
+                    f"Querying '{source}' for '{model_file.file_name}' failed: {ex}")
+                continue
+            if metadata:
+                for future in futures.values():
+                    future.cancel()
+                self._clear_miss(source, model_file.sha256)
+                return source, self._apis[source].get_api_url("hash", model_file.sha256), metadata
+            if not_found:
+                self._register_miss(source, model_file.sha256)
+        return None
+
+    def _link_model_file_batch(self, linkages: List[Tuple[Any, dict]]) -> None:
+        """
+        Internal method for writing a batch of linkages to the database.
+        :param linkages: List of tuples of model file and model version data.
+            The list is cleared afterwards.
+        """
+        if linkages:
+            self._logger.info(f"Linking {len(linkages)} model files.")
+            self._db.link_model_files(linkages)
+            linkages.clear()
 
     def calculate_linkage(self, model_file: Any) -> Optional[Tuple[str, str, dict]]:
         """
@@ -177,19 +896,314 @@ class StabeDiffusionModelHandler(AbstractModelHandler):
         :return: Tuple of source and API URL and metadata if found else None.
         """
         for possible_source in self._apis:
-            metadata = self._apis[possible_source].collect_metadata(
+            if self.is_known_miss(possible_source, model_file.sha256):
+                continue
+            metadata, not_found = self._apis[possible_source].resolve_metadata(
                 "hash", model_file.sha256)
             if metadata:
-                return possible_source, self._apis[possible_source].get_api_url("hash", model_file.sha256), self._apis[possible_source].normalize_metadata(metadata)
+                self._clear_miss(possible_source, model_file.sha256)
+                return possible_source, self._apis[possible_source].get_api_url("hash", model_file.sha256), metadata
+            if not_found:
+                self._register_miss(possible_source, model_file.sha256)
         return None
 
-    def update_metadata(self, *args: Optional[List], **kwargs: Optional[dict]) -> None:
+    def is_known_miss(self, source: str, sha256: str) -> bool:
         """
-        Method for updating cached metadata.
-        :param args: Arbitrary arguments.
-        :param kwargs: Arbitrary keyword arguments.
+        Method for checking whether a hash is a known miss at a source, which is not due for re-checking yet.
+        :param source: Source.
+        :param sha256: SHA256 hash.
+        :return: True, if the hash is a known miss and its TTL did not expire yet, else False.
         """
-        pass
+        with self._cache_lock:
+            entry = self._cache.get("negative_linkage", {}).get(
+                source, {}).get(sha256)
+        if entry is None:
+            return False
+        ttl = min(self.negative_cache_ttl * 2 ** (entry["misses"] - 1),
+                  self.negative_cache_max_ttl)
+        return time() < entry["checked"] + ttl
+
+    def _register_miss(self, source: str, sha256: str) -> None:
+        """
+        Internal method for registering a hash without a match at a source.
+        :param source: Source.
+        :param sha256: SHA256 hash.
+        """
+        with self._cache_lock:
+            source_entries = self._cache.setdefault(
+                "negative_linkage", {}).setdefault(source, {})
+            misses = source_entries.get(sha256, {}).get("misses", 0)
+            source_entries[sha256] = {"checked": time(), "misses": misses + 1}
+
+    def _clear_miss(self, source: str, sha256: str) -> None:
+        """
+        Internal method for removing a hash from the known misses of a source.
+        :param source: Source.
+        :param sha256: SHA256 hash.
+        """
+        with self._cache_lock:
+            self._cache.get("negative_linkage", {}).get(
+                source, {}).pop(sha256, None)
+
+    def clear_negative_cache(self, source: str = None) -> None:
+        """
+        Method for clearing known misses, forcing them to be queried again on the next linkage run.
+        :param source: Source to clear known misses for.
+            Defaults to None in which case known misses of all sources are cleared.
+        """
+        with self._cache_lock:
+            if source is None:
+                self._cache.pop("negative_linkage", None)
+            else:
+                self._cache.get("negative_linkage", {}).pop(source, None)
+
+    def check_asset_health(self, asset_folder: str = None, workers: int = None, draft_size: Tuple[int, int] = (128, 128),
+                           batch_size: int = 1000) -> dict:
+        """
+        Method for checking the health of downloaded image assets in bulk.
+        Image files are decoded at reduced resolution on a process pool, asset statuses are set to
+        'downloaded' or 'corrupted' in batches.
+        :param asset_folder: Asset folder to walk for image files.
+            Untracked corrupted image files in the folder are reported but not written back.
+            Defaults to None in which case the image files of all downloaded image assets are checked.
+        :param workers: Number of worker processes.
+            Defaults to None in which case the CPU count is used.
+        :param draft_size: Requested draft size for reduced resolution decoding.
+            Defaults to (128, 128).
+        :param batch_size: Number of status updates, written to the database at once.
+            Defaults to 1000.
+        :return: Report with numbers of checked, healthy and corrupted files, untracked corrupted files and throughput.
+        """
+        assets = {os.path.abspath(asset.path): asset for asset in self._db.get_assets(
+            "image", asset_folder, ["downloaded", "corrupted"], attributes=["id", "path", "status"])}
+        file_paths = list(assets)
+        if asset_folder is not None:
+            file_paths.extend(path for path in (os.path.abspath(entry.path) for entry in file_system_utility.walk_files(asset_folder)
+                                                if os.path.splitext(entry.name)[1].lower() in image_utility.IMAGE_EXTENSIONS)
+                              if path not in assets)
+
+        report = {"checked": 0, "healthy": 0,
+                  "corrupted": 0, "untracked_corrupted": []}
+        updates = []
+        start = time()
+        for file_path, healthy in image_utility.check_image_health_in_bulk(file_paths, workers, draft_size):
+            report["checked"] += 1
+            report["healthy" if healthy else "corrupted"] += 1
+            if file_path not in assets:
+                if not healthy:
+                    report["untracked_corrupted"].append(file_path)
+                continue
+            status = "downloaded" if healthy else "corrupted"
+            if assets[file_path].status != status:
+                updates.append({"id": assets[file_path].id, "status": status})
+            if len(updates) >= batch_size:
+                self._db.update_asset_statuses(updates)
+                updates.clear()
+        if updates:
+            self._db.update_asset_statuses(updates)
+
+        report["seconds"] = time() - start
+        report["files_per_second"] = report["checked"] / \
+            report["seconds"] if report["seconds"] else 0.0
+        self._logger.info(
+            f"Checked {report['checked']} image files in {report['seconds']:.1f}s ({report['files_per_second']:.1f} files/s), "
+            f"{report['corrupted']} corrupted.")
+        return report
+
+    def request_asset_thumbnails(self, size: Tuple[int, int], asset_folder: str = None, image_format: str = None,
+                                 batch_size: int = 1000) -> Dict[int, Any]:
+        """
+        Method for requesting thumbnails of downloaded image assets from the thumbnail cache.
+        Missing asset hashes are taken from the source hash index of the thumbnail cache and written back in batches,
+        so that sources are not hashed again. The source hash index is written once at the end.
+        :param size: Maximum thumbnail width and height.
+        :param asset_folder: Asset folder to request thumbnails for.
+            Defaults to None in which case thumbnails of all downloaded image assets are requested.
+        :param image_format: Thumbnail format, see 'thumbnail_caches.THUMBNAIL_FORMATS'.
+            Defaults to None in which case the default format of the thumbnail cache is used.
+        :param batch_size: Number of hash updates, written to the database at once.
+            Defaults to 1000.
+        :return: Dictionary, mapping asset IDs to futures, resolving to thumbnail paths.
+        """
+        if self.thumbnail_cache is None:
+            raise ValueError("Handler was initiated without thumbnail cache.")
+        thumbnails = {}
+        updates = []
+        for asset in self._db.get_assets("image", asset_folder, ["downloaded"], attributes=["id", "path", "sha256"]):
+            sha256 = asset.sha256
+            if sha256 is None:
+                try:
+                    sha256 = self.thumbnail_cache.get_source_hash(
+                        asset.path, persist=False)
+                except OSError as ex:
+                    self._logger.warning(
+                        f"Hashing '{asset.path}' failed with '{ex}', skipping.")
+                    continue
+                updates.append({"id": asset.id, "sha256": sha256})
+                if len(updates) >= batch_size:
+                    self._db.update_asset_hashes(updates)
+                    updates.clear()
+            thumbnails[asset.id] = self.thumbnail_cache.request_thumbnail(
+                asset.path, size, sha256, image_format)
+        if updates:
+            self._db.update_asset_hashes(updates)
+        self.thumbnail_cache.save_source_hashes()
+        return thumbnails
+
+    def update_metadata(self, sources: List[str] = None, metadata_ttls: Dict[str, float] = None, default_ttl: float = 604800.0,
+                        batch_size: int = 100) -> dict:
+        """
+        Method for updating cached metadata of stale model versions.
+        Model versions are stale, if their metadata was not updated within the TTL of their source.
+        Metadata is fetched in batches, only model versions with changed normalized metadata are patched,
+        the update timestamp of the others is refreshed.
+        Model versions, for which fetching metadata failed, are left untouched, so that they are retried.
+        :param sources: Sources to update metadata for.
+            Defaults to None in which case all sources are updated.
+        :param metadata_ttls: Dictionary, mapping sources to the time in seconds, after which their metadata is stale.
+            Defaults to None in which case the default TTL is used for all sources.
+        :param default_ttl: Time in seconds, after which metadata of sources without TTL is stale.
+            Defaults to 604800.0 (one week).
+        :param batch_size: Number of model versions to fetch and update at once.
+            Defaults to 100.
+        :return: Report with numbers of checked, changed, unchanged, missing and failed model versions.
+        """
+        metadata_ttls = metadata_ttls if metadata_ttls is not None else {}
+        report = {"checked": 0, "changed": 0, "unchanged": 0, "missing": 0, "failed": 0}
+        for source in (sources if sources is not None else self._apis):
+            cutoff = datetime.datetime.now() - datetime.timedelta(
+                seconds=metadata_ttls.get(source, default_ttl))
+            stale_versions = [version for version in self._db.get_stale_model_versions(
+                source, cutoff, ["id", "api_url", "inactive", "normalized_metadata"]) if version.inactive != "X"]
+            self._logger.info(
+                f"Updating metadata of {len(stale_versions)} stale model versions from '{source}'.")
+            for index in range(0, len(stale_versions), batch_size):
+                self._update_metadata_batch(
+                    source, stale_versions[index:index+batch_size], report)
+        return report
+
+    def _update_metadata_batch(self, source: str, model_versions: List[Any], report: dict) -> None:
+        """
+        Internal method for updating the metadata of a batch of model versions.
+        :param source: Metadata source.
+        :param model_versions: Model versions with "id", "api_url" and "normalized_metadata".
+        :param report: Report to update.
+        """
+        by_identifier = {}
+        for model_version in model_versions:
+            identifier, model_id = self._apis[source].parse_api_url(
+                model_version.api_url)
+            by_identifier.setdefault(identifier, {})[model_id] = model_version
+
+        now = datetime.datetime.now()
+        patches = []
+        for identifier in by_identifier:
+            metadata, not_found = self._apis[source].resolve_metadata_batch(
+                identifier, list(by_identifier[identifier]))
+            for model_id, model_version in by_identifier[identifier].items():
+                report["checked"] += 1
+                if not metadata.get(model_id):
+                    if model_id in not_found:
+                        report["missing"] += 1
+                        patches.append({"id": model_version.id, "updated": now})
+                    else:
+                        report["failed"] += 1
+                    continue
+                normalized_metadata = self._apis[source].normalize_metadata(
+                    metadata[model_id])
+                if normalized_metadata != model_version.normalized_metadata:
+                    report["changed"] += 1
+                    patches.append({"id": model_version.id, "metadata": metadata[model_id],
+                                    "normalized_metadata": normalized_metadata, "updated": now,
+                                    **extract_indexed_metadata(normalized_metadata)})
+                else:
+                    report["unchanged"] += 1
+                    patches.append({"id": model_version.id, "updated": now})
+        if patches:
+            self._db.update_model_versions(patches)
+
+    def find_duplicate_model_files(self) -> List[dict]:
+        """
+        Method for finding groups of duplicate model files by their SHA256 hash.
+        Files, which already share an inode, are not counted as reclaimable.
+        :return: List of duplicate groups with "sha256", "size", "files", "reclaimable_bytes" and "linkable_bytes".
+            Linkable bytes can be reclaimed by linking duplicates on the same filesystem.
+        """
+        groups = []
+        for sha256, model_files in self._db.get_duplicate_model_files(attributes=TRACKING_FIELDS).items():
+            files = []
+            for model_file in model_files:
+                file_path = os.path.join(model_file.folder, model_file.file_name)
+                try:
+                    fingerprint = file_system_utility.get_file_fingerprint(
+                        file_path)
+                except FileNotFoundError:
+                    continue
+                files.append({"id": model_file.id, "path": file_path, "fingerprint": fingerprint,
+                              "stored_fingerprint": self._get_stored_fingerprint(model_file)})
+            if len(files) < 2:
+                continue
+            inodes = {file["fingerprint"][:2] for file in files}
+            devices = {file["fingerprint"][0] for file in files}
+            size = files[0]["fingerprint"][2]
+            groups.append({"sha256": sha256, "size": size, "files": files,
+                           "reclaimable_bytes": size * (len(inodes) - 1),
+                           "linkable_bytes": size * (len(inodes) - len(devices))})
+        return groups
+
+    def deduplicate_model_files(self, mode: str = "hardlink", dry_run: bool = True) -> dict:
+        """
+        Method for deduplicating model files by replacing duplicates with links to a single copy per filesystem.
+        Only files, which were not modified since hashing, are linked.
+        The model files of each duplicate group are updated in a single transaction.
+        :param mode: Link mode: "hardlink" or "reflink", see 'file_system_utility.link_duplicate'.
+            Defaults to "hardlink".
+        :param dry_run: Flag for only reporting duplicates without linking them.
+            Defaults to True.
+        :return: Report with numbers of duplicate groups, reclaimable, linkable and reclaimed bytes and linked files.
+        """
+        groups = self.find_duplicate_model_files()
+        report = {"groups": len(groups),
+                  "reclaimable_bytes": sum(group["reclaimable_bytes"] for group in groups),
+                  "linkable_bytes": sum(group["linkable_bytes"] for group in groups),
+                  "reclaimed_bytes": 0,
+                  "linked": 0}
+        self._logger.info(
+            f"Found {report['groups']} duplicate groups with {report['reclaimable_bytes']} reclaimable bytes, "
+            f"{report['linkable_bytes']} of them linkable.")
+        if dry_run:
+            return report
+
+        for group in groups:
+            patches = []
+            by_device = {}
+            for file in group["files"]:
+                if file["fingerprint"] == file["stored_fingerprint"]:
+                    by_device.setdefault(file["fingerprint"][0], []).append(file)
+                else:
+                    self._logger.warning(
+                        f"'{file['path']}' was modified since hashing, skipping.")
+            for files in by_device.values():
+                source = files[0]
+                for duplicate in files[1:]:
+                    if duplicate["fingerprint"][:2] == source["fingerprint"][:2]:
+                        continue
+                    try:
+                        stat_result = file_system_utility.link_duplicate(
+                            source["path"], duplicate["path"], mode)
+                    except OSError as ex:
+                        self._logger.warning(
+                            f"Linking '{duplicate['path']}' to '{source['path']}' failed: {ex}")
+                        continue
+                    patches.append({"id": duplicate["id"], **dict(zip(FINGERPRINT_FIELDS, file_system_utility.get_file_fingerprint(
+                        duplicate["path"], stat_result)))})
+                    report["reclaimed_bytes"] += group["size"]
+                    report["linked"] += 1
+            if patches:
+                self._db.update_model_file_group(patches)
+        self._logger.info(
+            f"Linked {report['linked']} duplicates, reclaiming {report['reclaimed_bytes']} bytes.")
+        return report
 
     def organize_models(self, *args: Optional[List], **kwargs: Optional[dict]) -> None:
         """
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+****************************************************
+*           aura-cognitive-architecture            *
+*            (c) 2023 Alexander Hering             *
+****************************************************
+"""
+from time import monotonic, sleep, time
+from threading import Lock
+from urllib.parse import urlparse
+from email.utils import parsedate_to_datetime
+from typing import Optional, Dict
+
+
+class TokenBucketRateLimiter(object):
+    """
+    Class, representing a thread-safe token bucket rate limiter.
+    Tokens are refilled continuously at the given rate, up to the burst size.
+    """
+
+    def __init__(self, rate: float, burst: int = 1, default_backoff: float = 10.0) -> None:
+        """
+        Initiation method.
+        :param rate: Number of requests per second.
+        :param burst: Maximum number of requests, that can be issued at once after an idle phase.
+            Defaults to 1.
+        :param default_backoff: Time in seconds, for which requests are blocked after a rate limit response without Retry-After header.
+            Defaults to 10.0.
+        """
+        self.rate = rate
+        self.burst = burst
+        self.default_backoff = default_backoff
+        self._tokens = float(burst)
+        self._last_refill = monotonic()
+        self._blocked_until = 0.0
+        self._lock = Lock()
+
+    def _refill(self, now: float) -> None:
+        """
+        Internal method for refilling tokens.
+        Needs to be called while holding the lock.
+        :param now: Current monotonic time.
+        """
+        self._tokens = min(float(self.burst), self._tokens +
+                           (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        """
+        Method for acquiring tokens, blocking until they are available.
+        :param tokens: Number of tokens to acquire.
+            Can not exceed the burst size, since more tokens are never available at once.
+            Defaults to 1.0.
+        """
+        if tokens > self.burst:
+            raise ValueError(
+                f"Cannot acquire {tokens} tokens with a burst size of {self.burst}.")
+        while True:
+            with self._lock:
+                now = monotonic()
+                self._refill(now)
+                wait_time = self._blocked_until - now
+                if wait_time <= 0:
+                    if self._tokens >= tokens:
+                        self._tokens -= tokens
+                        return
+                    wait_time = (tokens - self._tokens) / self.rate
+            sleep(wait_time)
+
+    def block(self, delay: float = None) -> None:
+        """
+        Method for blocking all requests for a given time, e.g. after a rate limit response.
+        :param delay: Time in seconds.
+            Defaults to None in which case the default backoff is used.
+        """
+        with self._lock:
+            now = monotonic()
+            self._blocked_until = max(self._blocked_until, now + (
+                self.default_backoff if delay is None else delay))
+            self._tokens = 0.0
+            self._last_refill = now
+
+    def handle_response(self, status_code: int, headers: dict) -> bool:
+        """
+        Method for handling rate limit responses.
+        :param status_code: Response status code.
+        :param headers: Response headers.
+        :return: True, if the response was a rate limit response and requests were blocked, else False.
+        """
+        retry_after = parse_retry_after(headers.get("Retry-After"))
+        if status_code == 429 or (status_code == 503 and retry_after is not None):
+            self.block(retry_after)
+            return True
+        return False
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Function for parsing a Retry-After header value.
+    :param value: Header value, either in seconds or as HTTP date.
+    :return: Delay in seconds if value could be parsed, else None.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time())
+    except (TypeError, ValueError):
+        return None
+
+
+_RATE_LIMITERS: Dict[str, TokenBucketRateLimiter] = {}
+_RATE_LIMITERS_LOCK = Lock()
+
+
+def get_rate_limiter(url: str, rate: float = 1.0, burst: int = 5) -> TokenBucketRateLimiter:
+    """
+    Function for getting the rate limiter of a host, shared by all API wrappers in the process.
+    :param url: URL or host name.
+    :param rate: Number of requests per second, if a new rate limiter is created.
+        Defaults to 1.0.
+    :param burst: Maximum number of requests, that can be issued at once, if a new rate limiter is created.
+        Defaults to 5.
+    :return: Rate limiter.
+    """
+    host = urlparse(url).netloc or url
+    with _RATE_LIMITERS_LOCK:
+        if host not in _RATE_LIMITERS:
+            _RATE_LIMITERS[host] = TokenBucketRateLimiter(rate, burst)
+        return _RATE_LIMITERS[host]
@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+"""
+****************************************************
+*           aura-cognitive-architecture            *
+*            (c) 2023 Alexander Hering             *
+****************************************************
+"""
+import os
+import abc
+import json
+import sqlite3
+import hashlib
+from time import time
+from threading import Lock
+from logging import Logger
+from typing import Optional, Dict
+
+
+def get_auth_scope(headers: Optional[dict]) -> str:
+    """
+    Function for deriving the authorization scope of a request.
+    Credentials are hashed, so that they are not stored in plain text.
+    :param headers: Request headers.
+    :return: Authorization scope.
+    """
+    if not headers:
+        return ""
+    credentials = {key.lower(): str(headers[key]) for key in headers
+                   if key.lower() in ("authorization", "cookie")}
+    return hashlib.sha256(json.dumps(credentials, sort_keys=True).encode("utf-8")).hexdigest() if credentials else ""
+
+
+class AbstractResponseCache(abc.ABC):
+    """
+    Abstract class, representing a HTTP response cache.
+    Responses are keyed on URL and authorization scope and revalidated with ETag/Last-Modified once they are stale.
+    """
+
+    def __init__(self, freshness_rules: Dict[str, float] = None, default_freshness: float = 3600.0) -> None:
+        """
+        Initiation method.
+        :param freshness_rules: Dictionary, mapping URL prefixes to the time in seconds, for which cached responses are fresh.
+            The longest matching prefix is used.
+            Defaults to None in which case the default freshness applies to all URLs.
+        :param default_freshness: Time in seconds, for which cached responses to URLs without matching rule are fresh.
+            Defaults to 3600.0.
+        """
+        self.freshness_rules = freshness_rules if freshness_rules is not None else {}
+        self.default_freshness = default_freshness
+
+    def get_freshness(self, url: str) -> float:
+        """
+        Method for acquiring the freshness time of a URL.
+        :param url: URL.
+        :return: Time in seconds, for which cached responses are fresh.
+        """
+        matches = [prefix for prefix in self.freshness_rules if url.startswith(prefix)]
+        return self.freshness_rules[max(matches, key=len)] if matches else self.default_freshness
+
+    def is_fresh(self, url: str, entry: dict) -> bool:
+        """
+        Method for checking, whether a cached response can be used without revalidation.
+        :param url: URL.
+        :param entry: Cached response entry.
+        :return: True, if entry is fresh, else False.
+        """
+        return time() < entry["validated"] + self.get_freshness(url)
+
+    def get_conditional_headers(self, entry: Optional[dict]) -> dict:
+        """
+        Method for acquiring conditional request headers for revalidating a cached response.
+        :param entry: Cached response entry.
+        :return: Conditional request headers.
+        """
+        headers = {}
+        if entry is not None:
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    @abc.abstractmethod
+    def get(self, url: str, auth_scope: str) -> Optional[dict]:
+        """
+        Abstract method for getting a cached response entry.
+        :param url: URL.
+        :param auth_scope: Authorization scope.
+        :return: Cached response entry with "status", "etag", "last_modified", "content" and "validated", if found, else None.
+        """
+        pass
+
+    @abc.abstractmethod
+    def put(self, url: str, auth_scope: str, status: int, headers: dict, content: bytes) -> None:
+        """
+        Abstract method for caching a response.
+        :param url: URL.
+        :param auth_scope: Authorization scope.
+        :param status: Response status code.
+        :param headers: Response headers.
+        :param content: Response content.
+        """
+        pass
+
+    @abc.abstractmethod
+    def revalidate(self, url: str, auth_scope: str, headers: dict) -> None:
+        """
+        Abstract method for marking a cached response as revalidated after a "304 Not Modified" response.
+        :param url: URL.
+        :param auth_scope: Authorization scope.
+        :param headers: Response headers.
+        """
+        pass
+
+    @abc.abstractmethod
+    def clear(self) -> None:
+        """
+        Abstract method for clearing the cache.
+        """
+        pass
+
+
+class SQLiteResponseCache(AbstractResponseCache):
+    """
+    Class, representing a HTTP response cache, stored in a SQLite database.
+    The cache size is capped by evicting least recently used responses.
+    """
+
+    def __init__(self, database_path: str, max_size: int = 256 * 1024 * 1024, freshness_rules: Dict[str, float] = None,
+                 default_freshness: float = 3600.0) -> None:
+        """
+        Initiation method.
+        :param database_path: Path of the SQLite database file.
+        :param max_size: Maximum size of cached content in bytes.
+            Defaults to 256 MiB.
+        :param freshness_rules: Dictionary, mapping URL prefixes to the time in seconds, for which cached responses are fresh.
+            The longest matching prefix is used.
+            Defaults to None in which case the default freshness applies to all URLs.
+        :param default_freshness: Time in seconds, for which cached responses to URLs without matching rule are fresh.
+            Defaults to 3600.0.
+        """
+        super().__init__(freshness_rules, default_freshness)
+        self._logger = Logger("[SQLiteResponseCache]")
+        self.database_path = database_path
+        self.max_size = max_size
+        if os.path.dirname(database_path):
+            os.makedirs(os.path.dirname(database_path), exist_ok=True)
+        self._lock = Lock()
+        self._connection = sqlite3.connect(
+            database_path, check_same_thread=False)
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("""CREATE TABLE IF NOT EXISTS responses (
+                url TEXT NOT NULL,
+                auth_scope TEXT NOT NULL,
+                status INTEGER NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                content BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                validated REAL NOT NULL,
+                accessed REAL NOT NULL,
+                PRIMARY KEY (url, auth_scope))""")
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+            self._connection.commit()
+
+    def get(self, url: str, auth_scope: str) -> Optional[dict]:
+        """
+        Method for getting a cached response entry.
+        :param url: URL.
+        :param auth_scope: Authorization scope.
+        :return: Cached response entry with "status", "etag", "last_modified", "content" and "validated", if found, else None.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT status, etag, last_modified, content, validated FROM responses WHERE url = ? AND auth_scope = ?",
+                (url, auth_scope)).fetchone()
+            if row is None:
+                return None
+            self._connection.execute("UPDATE responses SET accessed = ? WHERE url = ? AND auth_scope = ?",
+                                     (time(), url, auth_scope))
+            self._connection.commit()
+        return dict(zip(("status", "etag", "last_modified", "content", "validated"), row))
+
+    def put(self, url: str, auth_scope: str, status: int, headers: dict, content: bytes) -> None:
+        """
+        Method for caching a response.
+        :param url: URL.
+        :param auth_scope: Authorization scope.
+        :param status: Response status code.
+        :param headers: Response headers.
+        :param content: Response content.
+        """
+        if len(content) > self.max_size:
+            return
+        now = time()
+        with self._lock:
+            self._connection.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                     (url, auth_scope, status, headers.get("ETag"), headers.get("Last-Modified"),
+                                      content, len(content), now, now))
+            self._evict()
+            self._connection.commit()
+
+    def revalidate(self, url: str, auth_scope: str, headers: dict) -> None:
+        """
+        Method for marking a cached response as revalidated after a "304 Not Modified" response.
+        :param url: URL.
+        :param auth_scope: Authorization scope.
+        :param headers: Response headers.
+        """
+        now = time()
+        with self._lock:
+            self._connection.execute("""UPDATE responses SET validated = ?, accessed = ?,
+                etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified)
+                WHERE url = ? AND auth_scope = ?""",
+                                     (now, now, headers.get("ETag"), headers.get("Last-Modified"), url, auth_scope))
+            self._connection.commit()
+
+    def clear(self) -> None:
+        """
+        Method for clearing the cache.
+        """
+        with self._lock:
+            self._connection.execute("DELETE FROM responses")
+            self._connection.commit()
+
+    def _evict(self) -> None:
+        """
+        Internal method for evicting least recently used responses until the cache size is within its limit.
+        Needs to be called while holding the lock.
+        """
+        total_size = self._connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total_size <= self.max_size:
+            return
+        evicted = 0
+        for url, auth_scope, size in self._connection.execute(
+                "SELECT url, auth_scope, size FROM responses ORDER BY accessed ASC").fetchall():
+            if total_size <= self.max_size:
+                break
+            self._connection.execute(
+                "DELETE FROM responses WHERE url = ? AND auth_scope = ?", (url, auth_scope))
+            total_size -= size
+            evicted += 1
+        self._logger.info(f"Evicted {evicted} cached responses.")
@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+"""
+****************************************************
+*           aura-cognitive-architecture            *
+*            (c) 2023 Alexander Hering             *
+****************************************************
+"""
+import os
+from collections import OrderedDict
+from threading import Lock
+from logging import Logger
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import List, Tuple, Dict
+from PIL import Image
+from src.utility.bronze import hashing_utility, json_utility
+from src.utility.silver import file_system_utility
+
+
+# Dictionary, mapping supported thumbnail formats to file extensions and encoder parameters
+THUMBNAIL_FORMATS = {
+    "webp": (".webp", {"format": "WEBP", "quality": 80, "method": 4}),
+    "jpeg": (".jpg", {"format": "JPEG", "quality": 85, "optimize": True, "progressive": True})
+}
+# File name of the persisted source hash index in the cache folder
+SOURCE_HASH_INDEX = "source_hashes.json"
+
+
+class ThumbnailCache(object):
+    """
+    Class, representing a cache for sized thumbnails of image assets.
+    Thumbnails are content-addressed by the SHA256 hash of their source image, their size and format.
+    They are generated lazily on first request by a worker pool and evicted in least recently used order,
+    once the cache exceeds its disk quota.
+    Calculated source hashes are persisted by source path and file fingerprint, so that unchanged sources are only hashed once.
+    The source hash index is written once per batch of requests and on shutdown.
+    """
+
+    def __init__(self, cache_folder: str, max_size: int = 1024*1024*1024, workers: int = 4, image_format: str = "webp") -> None:
+        """
+        Initiation method.
+        :param cache_folder: Cache folder.
+        :param max_size: Disk quota in bytes.
+            Defaults to 1 GiB.
+        :param workers: Number of thumbnail generation workers.
+            Defaults to 4.
+        :param image_format: Default thumbnail format, see THUMBNAIL_FORMATS.
+            Defaults to "webp".
+        """
+        self._logger = Logger("[ThumbnailCache]")
+        self.cache_folder = cache_folder
+        self.max_size = max_size
+        self.image_format = image_format
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._lock = Lock()
+        self._in_flight: Dict[str, Future] = {}
+        self._index = OrderedDict()
+        self._size = 0
+        self._source_hash_path = os.path.join(cache_folder, SOURCE_HASH_INDEX)
+        self._source_hashes: Dict[str, dict] = {}
+        self._source_hashes_changed = False
+        os.makedirs(cache_folder, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self) -> None:
+        """
+        Internal method for loading the LRU index from the cache folder.
+        The modification time of thumbnails is updated on access and therefore reflects the access order.
+        """
+        if os.path.exists(self._source_hash_path):
+            self._source_hashes = json_utility.load(self._source_hash_path)
+        entries = []
+        for root, _, files in os.walk(self.cache_folder):
+            for file in files:
+                file_path = os.path.join(root, file)
+                if file.endswith(".tmp"):
+                    os.remove(file_path)
+                    continue
+                if file_path == self._source_hash_path:
+                    continue
+                stat_result = os.stat(file_path)
+                entries.append(
+                    (stat_result.st_mtime, file_path, stat_result.st_size))
+        for _, file_path, size in sorted(entries):
+            self._index[file_path] = size
+            self._size += size
+
+    def get_source_hash(self, source_path: str, persist: bool = True) -> str:
+        """
+        Method for getting the SHA256 hash of a source image.
+        The hash is only calculated, if the source was not hashed before or changed since.
+        :param source_path: Source image path.
+        :param persist: Flag for writing the source hash index, if the hash was newly calculated.
+            Defaults to True. Batch callers should disable it and call 'save_source_hashes' once.
+        :return: SHA256 hash of the source image.
+        """
+        source_path = os.path.abspath(source_path)
+        fingerprint = list(file_system_utility.get_file_fingerprint(source_path))
+        with self._lock:
+            entry = self._source_hashes.get(source_path)
+        if entry is not None and entry["fingerprint"] == fingerprint:
+            return entry["sha256"]
+        sha256 = hashing_utility.hash_with_sha256(source_path)
+        with self._lock:
+            self._source_hashes[source_path] = {
+                "fingerprint": fingerprint, "sha256": sha256}
+            self._source_hashes_changed = True
+        if persist:
+            self.save_source_hashes()
+        return sha256
+
+    def save_source_hashes(self) -> None:
+        """
+        Method for atomically writing the source hash index, if it changed since it was last written.
+        """
+        with self._lock:
+            if not self._source_hashes_changed:
+                return
+            json_utility.save(self._source_hashes,
+                              self._source_hash_path + ".tmp")
+            os.replace(self._source_hash_path + ".tmp", self._source_hash_path)
+            self._source_hashes_changed = False
+
+    def get_thumbnail_path(self, sha256: str, size: Tuple[int, int], image_format: str = None) -> str:
+        """
+        Method for getting the content-addressed path of a thumbnail.
+        :param sha256: SHA256 hash of the source image.
+        :param size: Maximum thumbnail width and height.
+        :param image_format: Thumbnail format, see THUMBNAIL_FORMATS.
+            Defaults to None in which case the default format is used.
+        :return: Thumbnail path.
+        """
+        extension = THUMBNAIL_FORMATS[image_format or self.image_format][0]
+        return os.path.join(self.cache_folder, sha256[:2], f"{sha256}_{size[0]}x{size[1]}{extension}")
+
+    def get_thumbnail(self, source_path: str, size: Tuple[int, int], sha256: str = None, image_format: str = None) -> str:
+        """
+        Method for getting a thumbnail, generating it if it is not cached yet.
+        :param source_path: Source image path.
+        :param size: Maximum thumbnail width and height.
+        :param sha256: SHA256 hash of the source image.
+            Defaults to None in which case the hash is taken from the source hash index, see 'get_source_hash'.
+        :param image_format: Thumbnail format, see THUMBNAIL_FORMATS.
+            Defaults to None in which case the default format is used.
+        :return: Thumbnail path.
+        """
+        return self.request_thumbnail(source_path, size, sha256, image_format).result()
+
+    def request_thumbnail(self, source_path: str, size: Tuple[int, int], sha256: str = None, image_format: str = None) -> Future:
+        """
+        Method for requesting a thumbnail without waiting for its generation.
+        Concurrent requests for the same thumbnail share the same generation.
+        :param source_path: Source image path.
+        :param size: Maximum thumbnail width and height.
+        :param sha256: SHA256 hash of the source image.
+            Defaults to None in which case the hash is taken from the source hash index, see 'get_source_hash'.
+            Newly calculated hashes are written with the next batch or on shutdown.
+        :param image_format: Thumbnail format, see THUMBNAIL_FORMATS.
+            Defaults to None in which case the default format is used.
+        :return: Future, resolving to the thumbnail path.
+        """
+        if sha256 is None:
+            sha256 = self.get_source_hash(source_path, persist=False)
+        thumbnail_path = self.get_thumbnail_path(sha256, size, image_format)
+        with self._lock:
+            if thumbnail_path in self._index:
+                self._index.move_to_end(thumbnail_path)
+                future = Future()
+                future.set_result(thumbnail_path)
+            elif thumbnail_path in self._in_flight:
+                return self._in_flight[thumbnail_path]
+            else:
+                future = self._executor.submit(self._generate, source_path, thumbnail_path, size,
+                                               image_format or self.image_format)
+                self._in_flight[thumbnail_path] = future
+                return future
+        try:
+            os.utime(thumbnail_path)
+        except FileNotFoundError:
+            # Thumbnail was removed externally, regenerate it
+            with self._lock:
+                self._size -= self._index.pop(thumbnail_path, 0)
+            return self.request_thumbnail(source_path, size, sha256, image_format)
+        return future
+
+    def prefetch(self, sources: List[Tuple[str, str]], sizes: List[Tuple[int, int]], image_format: str = None) -> List[Future]:
+        """
+        Method for generating thumbnails in advance.
+        :param sources: List of tuples of source image path and SHA256 hash, which might be None.
+        :param sizes: Thumbnail sizes to generate.
+        :param image_format: Thumbnail format, see THUMBNAIL_FORMATS.
+            Defaults to None in which case the default format is used.
+        :return: List of futures, resolving to thumbnail paths.
+        """
+        futures = [self.request_thumbnail(source_path, size, sha256, image_format)
+                   for source_path, sha256 in sources for size in sizes]
+        self.save_source_hashes()
+        return futures
+
+    def _generate(self, source_path: str, thumbnail_path: str, size: Tuple[int, int], image_format: str) -> str:
+        """
+        Internal method for generating a thumbnail.
+        :param source_path: Source image path.
+        :param thumbnail_path: Thumbnail path.
+        :param size: Maximum thumbnail width and height.
+        :param image_format: Thumbnail format.
+        :return: Thumbnail path.
+        """
+        try:
+            os.makedirs(os.path.dirname(thumbnail_path), exist_ok=True)
+            with Image.open(source_path) as img:
+                img.draft("RGB", size)
+                img.thumbnail(size)
+                if image_format == "jpeg" or img.mode not in ("RGB", "RGBA"):
+                    img = img.convert(
+                        "RGBA" if image_format == "webp" and "A" in img.getbands() else "RGB")
+                img.save(thumbnail_path + ".tmp",
+                         **THUMBNAIL_FORMATS[image_format][1])
+            os.replace(thumbnail_path + ".tmp", thumbnail_path)
+            with self._lock:
+                self._index[thumbnail_path] = os.path.getsize(thumbnail_path)
+                self._size += self._index[thumbnail_path]
+                self._evict()
+            return thumbnail_path
+        finally:
+            with self._lock:
+                self._in_flight.pop(thumbnail_path, None)
+
+    def _evict(self) -> None:
+        """
+        Internal method for evicting least recently used thumbnails until the cache is within its disk quota.
+        Needs to be called while holding the lock.
+        """
+        while self._size > self.max_size and len(self._index) > 1:
+            thumbnail_path, size = self._index.popitem(last=False)
+            self._size -= size
+            try:
+                os.remove(thumbnail_path)
+            except FileNotFoundError:
+                pass
+
+    def get_size(self) -> int:
+        """
+        Method for getting the current cache size.
+        :return: Cache size in bytes.
+        """
+        with self._lock:
+            return self._size
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Method for shutting down the worker pool and writing the source hash index.
+        :param wait: Flag for waiting for running generations to finish.
+            Defaults to True.
+        """
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+        self.save_source_hashes()
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+****************************************************
+*           aura-cognitive-architecture            *
+*            (c) 2023 Alexander Hering             *
+****************************************************
+"""
+import os
+import sys
+import shutil
+import tempfile
+from time import perf_counter
+from typing import List, Any
+from src.utility.bronze import hashing_utility
+
+
+def create_sparse_file(file_path: str, size: int, filled_blocks: int = 64, block_size: int = 1024*1024) -> None:
+    """
+    Function for creating a sparse synthetic file with evenly distributed random blocks.
+    :param file_path: File path.
+    :param size: File size in bytes.
+    :param filled_blocks: Number of filled blocks.
+        Defaults to 64.
+    :param block_size: Size of filled blocks in bytes.
+        Defaults to 1 MiB.
+    """
+    with open(file_path, "wb") as f:
+        f.truncate(size)
+        stride = max(size // filled_blocks, block_size)
+        for offset in range(0, size - block_size + 1, stride):
+            f.seek(offset)
+            f.write(os.urandom(block_size))
+
+
+def measure(function: Any, file_paths: List[str], *args: Any, **kwargs: Any) -> float:
+    """
+    Function for measuring the runtime of a hashing function over multiple files.
+    :param function: Hashing function.
+    :param file_paths: File paths.
+    :param args: Arguments to forward to function call.
+    :param kwargs: Keyword arguments to forward to function call.
+    :return: Runtime in seconds.
+    """
+    start = perf_counter()
+    for file_path in file_paths:
+        function(file_path, *args, **kwargs)
+    return perf_counter() - start
+
+
+def run_benchmark(file_size: int = 1024*1024*1024, file_count: int = 2, repetitions: int = 3) -> dict:
+    """
+    Function for benchmarking the multi-digest hasher against the single digest SHA256 hasher.
+    The baseline reads the files once per digest, the multi-digest hasher reads them once.
+    :param file_size: Size of synthetic files in bytes.
+        Defaults to 1 GiB.
+    :param file_count: Number of synthetic files.
+        Defaults to 2.
+    :param repetitions: Number of repetitions, the best run is reported.
+        Defaults to 3.
+    :return: Dictionary, mapping benchmark cases to tuples of runtime in seconds and number of hashed bytes.
+    """
+    digests = ["sha256", "blake2b", "crc32"]
+    folder = tempfile.mkdtemp()
+    try:
+        file_paths = [os.path.join(folder, f"synthetic_{index}.safetensors")
+                      for index in range(file_count)]
+        for file_path in file_paths:
+            create_sparse_file(file_path, file_size)
+
+        # benchmark cases, mapped to measurement functions and the number of passes over the files
+        cases = {
+            "hash_with_sha256": (lambda: measure(hashing_utility.hash_with_sha256, file_paths), 1),
+            "hash_with_sha256 + separate passes": (lambda: measure(hashing_utility.hash_with_sha256, file_paths) + sum(
+                measure(hashing_utility.hash_with_multiple_digests, file_paths, [digest], 128*1024) for digest in digests[1:]), len(digests)),
+            "multiple digests, buffered": (lambda: measure(hashing_utility.hash_with_multiple_digests, file_paths, digests), 1),
+            "multiple digests, mmap": (lambda: measure(hashing_utility.hash_with_multiple_digests, file_paths, digests, use_mmap=True), 1),
+            "sha256 only, buffered": (lambda: measure(hashing_utility.hash_with_multiple_digests, file_paths, ["sha256"]), 1),
+        }
+        return {case: (min(cases[case][0]() for _ in range(repetitions)), cases[case][1] * file_count * file_size)
+                for case in cases}
+    finally:
+        shutil.rmtree(folder)
+
+
+if __name__ == "__main__":
+    file_size = int(sys.argv[1]) if len(sys.argv) > 1 else 1024*1024*1024
+    for case, (runtime, hashed_bytes) in run_benchmark(file_size).items():
+        print(f"{case:<40} {runtime:8.3f}s {hashed_bytes / runtime / 1024**2:10.1f} MiB/s")
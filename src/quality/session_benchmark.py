@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+****************************************************
+*           aura-cognitive-architecture            *
+*            (c) 2023 Alexander Hering             *
+****************************************************
+"""
+import sys
+import requests
+from time import perf_counter
+from threading import Thread
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+from src.utility.bronze import requests_utility
+
+
+class StandInRequestHandler(BaseHTTPRequestHandler):
+    """
+    Class, representing a request handler of a local stand-in API server, answering with a small JSON payload.
+    """
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately, Nagle's algorithm would delay the body on kept-alive connections
+    disable_nagle_algorithm = True
+    payload = b'{"id": 1, "name": "model", "files": []}'
+
+    def do_GET(self) -> None:
+        """
+        Method for handling GET requests.
+        """
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(self.payload)))
+        self.end_headers()
+        self.wfile.write(self.payload)
+
+    def log_message(self, *args: Any) -> None:
+        """
+        Method for suppressing request logging.
+        """
+        pass
+
+
+def measure(get: Any, url: str, request_count: int, workers: int) -> float:
+    """
+    Function for measuring the runtime of a number of GET requests.
+    :param get: GET function.
+    :param url: URL.
+    :param request_count: Number of requests.
+    :param workers: Number of concurrent workers.
+    :return: Runtime in seconds.
+    """
+    start = perf_counter()
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(lambda _: get(url).content, range(request_count)))
+    else:
+        for _ in range(request_count):
+            get(url).content
+    return perf_counter() - start
+
+
+def run_benchmark(request_count: int = 1000, workers: int = 8) -> dict:
+    """
+    Function for benchmarking pooled keep-alive sessions against module-level requests.get against a local stand-in server.
+    :param request_count: Number of requests per case.
+        Defaults to 1000.
+    :param workers: Number of concurrent workers for the concurrent cases.
+        Defaults to 8.
+    :return: Dictionary, mapping benchmark cases to runtimes in seconds.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInRequestHandler)
+    server.daemon_threads = True
+    Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/api/v1/models/1"
+    session = requests_utility.get_pooled_session(pool_size=workers)
+    try:
+        return {
+            "requests.get, serial": measure(requests.get, url, request_count, 1),
+            "pooled session, serial": measure(session.get, url, request_count, 1),
+            f"requests.get, {workers} workers": measure(requests.get, url, request_count, workers),
+            f"pooled session, {workers} workers": measure(session.get, url, request_count, workers),
+        }
+    finally:
+        session.close()
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    request_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    for case, runtime in run_benchmark(request_count).items():
+        print(f"{case:<40} {runtime:8.3f}s {request_count / runtime:10.1f} requests/s")
@@ -80,6 +80,11 @@ COMPARISON_METHOD_DICTIONARY = {
     "not_has": lambda x, y: y not in x,
     "in": lambda x, y: x in y,
     "not_in": lambda x, y: x not in y,
+    "<": lambda x, y: x < y,
+    "<=": lambda x, y: x <= y,
+    ">": lambda x, y: x > y,
+    ">=": lambda x, y: x >= y,
+    "startswith": lambda x, y: x.startswith(y),
     "and": lambda *x: all(x),
     "or": lambda *x: any(x),
     "not": lambda x: not x,
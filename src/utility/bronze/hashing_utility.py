@@ -5,7 +5,50 @@
 *            (c) 2023 Alexander Hering             *
 ****************************************************
 """
+import os
+import mmap
+import zlib
 import hashlib
+from typing import List
+
+
+class CRC32(object):
+    """
+    Class, representing a CRC32 checksum with a hashlib-like interface.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initiation method.
+        """
+        self._value = 0
+
+    def update(self, data: bytes) -> None:
+        """
+        Method for updating the checksum.
+        :param data: Data to update checksum with.
+        """
+        self._value = zlib.crc32(data, self._value)
+
+    def hexdigest(self) -> str:
+        """
+        Method for getting the checksum as hex string.
+        :return: Checksum.
+        """
+        return f"{self._value:08x}"
+
+
+# Dictionary, mapping digest names to digest factories
+DIGEST_FACTORIES = {
+    "sha256": hashlib.sha256,
+    "blake2b": hashlib.blake2b,
+    "crc32": CRC32
+}
+# Dictionary, mapping derived digest names to source digest and derivation function
+# AutoV2 is the short hash, used by Civitai
+DERIVED_DIGESTS = {
+    "autov2": ("sha256", lambda digest: digest[:10].upper())
+}
 
 
 def hash_with_sha256(file_path: str) -> str:
@@ -20,4 +63,76 @@ def hash_with_sha256(file_path: str) -> str:
     with open(file_path, 'rb', buffering=0) as f:
         for n in iter(lambda : f.readinto(mv), 0):
             h.update(mv[:n])
-    return h.hexdigest()
\ No newline at end of file
+    return h.hexdigest()
+
+def hash_with_sampling(file_path: str, sample_size: int = 64*1024, samples: int = 16) -> str:
+    """
+    Function for quickly hashing file with SHA256 over its size, head, tail and evenly strided blocks.
+    The result is not a content hash, but a cheap fingerprint for detecting duplicates and changes early.
+    Files, which are not larger than the sampled blocks, are hashed completely.
+    :param file_path: File path.
+    :param sample_size: Size of each sampled block in bytes.
+        Defaults to 64 KiB.
+    :param samples: Number of sampled blocks, including head and tail.
+        Defaults to 16.
+    :return: Hash.
+    """
+    h = hashlib.sha256()
+    with open(file_path, 'rb', buffering=0) as f:
+        size = os.fstat(f.fileno()).st_size
+        h.update(size.to_bytes(8, "little"))
+        if size <= sample_size * samples:
+            for chunk in iter(lambda: f.read(sample_size), b""):
+                h.update(chunk)
+        else:
+            stride = (size - sample_size) // (samples - 1)
+            for index in range(samples):
+                f.seek(index * stride if index < samples - 1 else size - sample_size)
+                h.update(f.read(sample_size))
+    return h.hexdigest()
+
+
+def hash_with_multiple_digests(file_path: str, digests: List[str] = ["sha256"], buffer_size: int = 8*1024*1024,
+                               use_mmap: bool = False) -> dict:
+    """
+    Function for hashing file with multiple digests, reading the file only once.
+    :param file_path: File path.
+    :param digests: Digests to calculate out of 'sha256', 'blake2b', 'crc32' and 'autov2'.
+        Defaults to ['sha256'].
+    :param buffer_size: Read buffer size in bytes, rounded up to a multiple of the memory page size.
+        Defaults to 8 MiB.
+    :param use_mmap: Flag for reading the file via memory mapping instead of buffered reads.
+        Defaults to False.
+    :return: Dictionary, mapping digest names to hashes.
+    """
+    hashes = {}
+    for digest in digests:
+        digest = DERIVED_DIGESTS[digest][0] if digest in DERIVED_DIGESTS else digest
+        if digest not in hashes:
+            hashes[digest] = DIGEST_FACTORIES[digest]()
+    buffer_size = -(-buffer_size // mmap.PAGESIZE) * mmap.PAGESIZE
+
+    with open(file_path, 'rb', buffering=0) as f:
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        size = os.fstat(f.fileno()).st_size
+        if use_mmap and size > 0:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if hasattr(mm, "madvise"):
+                    mm.madvise(mmap.MADV_SEQUENTIAL)
+                mv = memoryview(mm)
+                try:
+                    for offset in range(0, size, buffer_size):
+                        for h in hashes.values():
+                            h.update(mv[offset:offset+buffer_size])
+                finally:
+                    mv.release()
+        else:
+            mv = memoryview(bytearray(buffer_size))
+            for n in iter(lambda: f.readinto(mv), 0):
+                for h in hashes.values():
+                    h.update(mv[:n])
+
+    hexdigests = {digest: hashes[digest].hexdigest() for digest in hashes}
+    return {digest: DERIVED_DIGESTS[digest][1](hexdigests[DERIVED_DIGESTS[digest][0]]) if digest in DERIVED_DIGESTS
+            else hexdigests[digest] for digest in digests}
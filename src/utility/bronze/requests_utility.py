@@ -6,9 +6,12 @@
 ****************************************************
 """
 from time import sleep
-from typing import Union, List, Any, Optional
+from threading import Lock
+from typing import Union, List, Any, Optional, Tuple
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from lxml import html
 
 
@@ -26,7 +29,7 @@ def get_page_content(url: str) -> html.HtmlElement:
     :param url: URL to get page content for.
     :return: Page content.
     """
-    page = requests.get(url)
+    page = get_shared_session().get(url)
     return html.fromstring(page.content)
 
 
@@ -43,6 +46,82 @@ def get_session(proxy_dict: dict = None) -> requests.Session:
     return session
 
 
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """
+    Class, representing a HTTP adapter, which applies a default timeout to requests without explicit timeout.
+    """
+
+    def __init__(self, *args: Optional[Any], timeout: Union[float, Tuple[float, float]] = (5.0, 60.0), **kwargs: Optional[Any]) -> None:
+        """
+        Initiation method.
+        :param args: Arguments, passed on to the HTTP adapter.
+        :param timeout: Default timeout in seconds or tuple of connect and read timeout.
+            Defaults to (5.0, 60.0).
+        :param kwargs: Keyword arguments, passed on to the HTTP adapter.
+        """
+        self.timeout = timeout
+        super().__init__(*args, **kwargs)
+
+    def send(self, request: requests.PreparedRequest, **kwargs: Optional[Any]) -> requests.Response:
+        """
+        Method for sending requests.
+        :param request: Prepared request.
+        :param kwargs: Keyword arguments, passed on to the HTTP adapter.
+        :return: Response.
+        """
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        return super().send(request, **kwargs)
+
+
+def get_pooled_session(pool_size: int = 10, max_retries: int = 3, backoff_factor: float = 0.5,
+                       timeout: Union[float, Tuple[float, float]] = (5.0, 60.0), keep_alive: bool = True,
+                       proxy_dict: dict = None) -> requests.Session:
+    """
+    Function for getting a requests session with a connection pool, retries and default timeouts.
+    The session can be shared between threads, requests block while all pooled connections are in use.
+    :param pool_size: Maximum number of pooled connections per host.
+        Defaults to 10.
+    :param max_retries: Maximum number of retries on connection errors and server errors.
+        Defaults to 3.
+    :param backoff_factor: Backoff factor for retries.
+        Defaults to 0.5.
+    :param timeout: Default timeout in seconds or tuple of connect and read timeout.
+        Defaults to (5.0, 60.0).
+    :param keep_alive: Flag for keeping connections alive between requests.
+        Defaults to True.
+    :param proxy_dict: Proxy dictionary.
+        Defaults to None.
+    :return: Session.
+    """
+    session = get_session(proxy_dict)
+    retry = Retry(total=max_retries, backoff_factor=backoff_factor, status_forcelist=(500, 502, 504),
+                  allowed_methods=frozenset(["GET", "HEAD"]), raise_on_status=False)
+    adapter = TimeoutHTTPAdapter(timeout=timeout, pool_connections=pool_size, pool_maxsize=pool_size,
+                                 max_retries=retry, pool_block=True)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if not keep_alive:
+        session.headers["Connection"] = "close"
+    return session
+
+
+_SHARED_SESSION = None
+_SHARED_SESSION_LOCK = Lock()
+
+
+def get_shared_session() -> requests.Session:
+    """
+    Function for getting the pooled session, shared by the utility functions.
+    :return: Session.
+    """
+    global _SHARED_SESSION
+    with _SHARED_SESSION_LOCK:
+        if _SHARED_SESSION is None:
+            _SHARED_SESSION = get_pooled_session()
+        return _SHARED_SESSION
+
+
 def safely_get_elements(html_element: html.HtmlElement, xpath: str) -> List[Any]:
     """
     Function for safely searching for elements in a Selenium WebElement.
@@ -89,7 +168,7 @@ def safely_request_page(url, tries: int = 5, delay: float = 2.0) -> requests.Res
     :param delay: Delay to wait before sending off next request. Defaults to 2.0 seconds.
     :return: Response.
     """
-    resp = requests.get(url)
+    resp = get_shared_session().get(url)
     j = 0
     while (resp.status_code == 404 or resp.status_code == 403) and j < tries:
         j += 1
@@ -6,7 +6,7 @@
 ****************************************************
 """
 import copy
-from sqlalchemy import Column, String, Boolean, Integer, JSON, Text, DateTime, CHAR, ForeignKey, Table, Float, BLOB, TEXT
+from sqlalchemy import Column, String, Boolean, Integer, BigInteger, JSON, Text, DateTime, CHAR, ForeignKey, Table, Float, BLOB, TEXT, MetaData, Index
 from sqlalchemy.orm import Session, relationship
 from sqlalchemy import and_, or_, not_
 from sqlalchemy import create_engine
@@ -27,7 +27,9 @@ SUPPORTED_DIALECTS = ["sqlite", "mysql",
 # Conversion dictionary for SQLAlchemy typing
 SQLALCHEMY_TYPING_DICTIONARY = {
     "int": Integer,
+    "bigint": BigInteger,
     "dict": JSON,
+    "json": JSON,
     "datetime": DateTime,
     "str": String(60),
     "str_": String,
@@ -81,25 +83,99 @@ def get_session_factory(engine: Engine) -> Any:
     )
 
 
-def get_automapped_base(engine: Engine) -> Any:
+def get_automapped_base(engine: Engine, schemas: List[str] = None) -> Any:
     """
     Function for getting prepared automap base.
     :param engine: Engine to bind session factory to.
+    :param schemas: Schemas to reflect in addition to the default schema, if existing.
+        Defaults to None.
     :return: Automap base.
     """
     base = automap_base()
-    base.prepare(autoload_with=engine, reflect=True)
+    base.prepare(autoload_with=engine)
+    existing_schemas = inspect(engine).get_schema_names() if schemas else []
+    for schema in [schema for schema in schemas or [] if schema in existing_schemas]:
+        base.prepare(autoload_with=engine, schema=schema)
     return base
 
 
+def map_added_classes(base: Any) -> None:
+    """
+    Function for mapping classes, which were added to a prepared automap base.
+    Relationships are only taken from the linkage profiles of the added classes.
+    :param base: Automap base.
+    """
+    base.prepare(generate_relationship=lambda *args, **kwargs: None)
+
+
 def get_classes_from_base(base: Any) -> dict:
     """
     Function for getting class dictionary for existing tables.
     :param base: Base to get classes from.
     :return: Class dictionary, mapping entity name to ORM class.
     """
-    return {table: base.classes[classname_for_table(base, table, base.metadata.tables[table])] for table in
-            base.metadata.tables}
+    return {base.metadata.tables[table].name: base.classes[classname_for_table(
+        base, base.metadata.tables[table].name, base.metadata.tables[table])] for table in base.metadata.tables}
+
+
+def get_column_type(type_string: str, typing_translation: dict = SQLALCHEMY_TYPING_DICTIONARY) -> Any:
+    """
+    Function for getting a column type from a type string.
+    :param type_string: Type string, e.g. "int" or "str_180".
+    :param typing_translation: Typing translation dictionary. Defaults to default sqlalchemy-translation.
+    :return: Column type.
+    """
+    if "_" not in type_string:
+        return typing_translation[type_string]
+    return typing_translation[type_string.split("_")[0] + "_"](*[int(arg) for arg in type_string.split("_")[1:]])
+
+
+def add_missing_columns(engine: Engine, table_name: str, column_data: dict, schema: str = None,
+                        typing_translation: dict = SQLALCHEMY_TYPING_DICTIONARY) -> List[str]:
+    """
+    Function for adding columns and indices to an existing table, which were added to its profile after the table was created.
+    Added columns are nullable and without server-side defaults.
+    :param engine: Database engine.
+    :param table_name: Table name.
+    :param column_data: Column data dictionary.
+        Columns with a truthy "index" entry are indexed, if no index over the column exists.
+    :param schema: Table schema.
+        Defaults to None.
+    :param typing_translation: Typing translation dictionary. Defaults to default sqlalchemy-translation.
+    :return: Names of the added columns.
+    """
+    inspector = inspect(engine)
+    if not inspector.has_table(table_name, schema=schema):
+        return []
+    existing_columns = [column["name"]
+                        for column in inspector.get_columns(table_name, schema=schema)]
+    indexed_columns = [index["column_names"]
+                       for index in inspector.get_indexes(table_name, schema=schema)]
+    quote = engine.dialect.identifier_preparer.quote
+    full_table_name = f"{quote(schema)}.{quote(table_name)}" if schema else quote(
+        table_name)
+    added_columns = []
+    with engine.begin() as connection:
+        for param in [param for param in column_data if param != "#meta" and param not in existing_columns]:
+            column_type = get_column_type(
+                column_data[param]["type"], typing_translation)
+            column_type = column_type() if isinstance(
+                column_type, type) else column_type
+            connection.execute(text(
+                f"ALTER TABLE {full_table_name} ADD COLUMN {quote(param)} {column_type.compile(dialect=engine.dialect)}"))
+            added_columns.append(param)
+        indexed_params = [param for param in column_data if param != "#meta" and column_data[param].get("index", False)
+                          and [param] not in indexed_columns]
+        if indexed_params:
+            # indices are created via SQLAlchemy, since dialects differ in qualifying them with schemas
+            table = Table(table_name, MetaData(), schema=schema, autoload_with=connection)
+            for param in indexed_params:
+                Index(f"ix_{table_name}_{param}", table.c[param]).create(connection)
+    return added_columns
+
+
+# Attribute names, reserved by the Declarative API, which can only be mapped via mapper arguments
+RESERVED_DECLARATIVE_ATTRIBUTES = ["metadata", "registry"]
 
 
 def create_mapping_from_dictionary(mapping_base: Any, entity_type: str, column_data: dict, linkage_data: dict = None, typing_translation: dict = SQLALCHEMY_TYPING_DICTIONARY) -> Any:
@@ -108,22 +184,30 @@ def create_mapping_from_dictionary(mapping_base: Any, entity_type: str, column_d
     :param mapping_base: Mapping base class.
     :param entity_type: Entity type to create mapping for.
     :param column_data: Column data dictionary.
+        Columns with a truthy "deferred" entry are loaded lazily on first access.
+        Columns with names, reserved by the Declarative API, e.g. "metadata", are mapped via mapper arguments.
     :param linkage_data: Linkage data dictionary. Defaults to None
     :param typing_translation: Typing translation dictionary. Defaults to default sqlalchemy-translation.
     :return: Mapping class.
     """
     class_data = {"__tablename__": entity_type}
     desc = column_data.get("#meta", {}).get("description", False)
+    schema = column_data.get("#meta", {}).get("schema", False)
     if column_data.get("#meta", False):
         class_data["__table_args__"] = copy.deepcopy(column_data["#meta"])
 
+    columns = {
+        param: Column(param, get_column_type(column_data[param]["type"], typing_translation), **column_data[param].get("schema_args", {}))
+        for param in column_data if param != "#meta"
+    }
+    properties = {param: orm.deferred(columns[param]) if column_data[param].get("deferred", False) else columns[param]
+                  for param in columns}
     class_data.update(
-        {
-            param: Column(typing_translation[column_data[param]["type"]], **column_data[param].get("schema_args", {})) if "_" not in column_data[param]["type"]
-            else Column(typing_translation[column_data[param]["type"].split("_")[0] + "_"](*[int(arg) for arg in column_data[param]["type"].split("_")[1:]]), **column_data[param].get("schema_args", {}))
-            for param in column_data if param != "#meta"
-        }
-    )
+        {param: properties[param] for param in properties if param not in RESERVED_DECLARATIVE_ATTRIBUTES})
+    reserved_columns = [param for param in columns if param in RESERVED_DECLARATIVE_ATTRIBUTES]
+    if reserved_columns:
+        class_data["__mapper_args__"] = {"properties": {
+            param: properties[param] for param in reserved_columns}}
     if linkage_data is not None:
         for profile in [profile for profile in linkage_data if
                         linkage_data[profile]["linkage_type"] == "foreign_key" and linkage_data[profile][
@@ -152,13 +236,17 @@ def create_mapping_from_dictionary(mapping_base: Any, entity_type: str, column_d
             ) + linkage_data[profile]["source"][1:]
             source = linkage_data[profile]["source"]
             source_key = linkage_data[profile]["source_key"][1]
+            source_table = f"{schema}.{source}" if schema else source
             if linkage_data[profile]["relation"].startswith("1:"):
                 class_data.update({
                     f"{source}_{source_key}": Column(
                         typing_translation[linkage_data[profile]
                                            ["source_key"][0]],
-                        ForeignKey(f"{source}.{source_key}")
+                        ForeignKey(f"{source_table}.{source_key}")
                     ),
                     profile: relationship(source_class, back_populates=profile)
                 })
-    return type(entity_type[0].upper()+entity_type[1:], (mapping_base,), class_data)
+    mapping_class = type(entity_type[0].upper()+entity_type[1:], (mapping_base,), class_data)
+    for param in reserved_columns:
+        mapping_class.__table__.append_column(columns[param])
+    return mapping_class
@@ -9,11 +9,20 @@
 from abc import ABC, abstractmethod
 import copy
 import hashlib
-from typing import List, Optional, Union, Any
+import secrets
+import datetime
+import functools
+from time import monotonic
+from threading import Lock
+from typing import List, Optional, Union, Any, Callable, Dict, Tuple, Iterator
 from ..silver import environment_utility
 from .filter_mask import FilterMask
 
 
+# Global namespace for lambda functions in entity profiles
+LAMBDA_NAMESPACE = {"datetime": datetime}
+
+
 def get_authorization_token(password: str) -> str:
     """
     Function for getting an authorization token.
@@ -26,6 +35,8 @@ def get_authorization_token(password: str) -> str:
 def handle_gateways(filter_index: int = None, data_index: Union[int, List[int]] = None, skip: bool = False) -> Any:
     """
     Decorator method for wrapping interfacing methods and handling defaults, obfuscation and deobuscation.
+    The gateway handling is compiled into a pipeline per entity type and interfacing method on interface initiation,
+    see 'EntityDataInterface.compile_gateway_pipeline'.
     :param filter_index: Index of filter argument.
     :param data_index: Index (or indices) of data argument(s).
     :param skip: Skip gateways.
@@ -38,9 +49,19 @@ def handle_gateways(filter_index: int = None, data_index: Union[int, List[int]]
         :param func: Interfacing function.
         :return: Interfacing function decorator.
         """
+        if skip:
+            return func
+
         batch = func.__name__.endswith("_batch")
-        interface_method = func.__name__.replace("_batch", "")
+        gateway_spec = {
+            "function": func,
+            "method": func.__name__.strip("_").replace("_batch", ""),
+            "batch": batch,
+            "filter_index": filter_index,
+            "data_indices": [data_index] if isinstance(data_index, int) else list(data_index or [])
+        }
 
+        @functools.wraps(func)
         def func_wrapper(*args: Optional[Any], **kwargs: Optional[Any]) -> Any:
             """
             Function wrapper for wrapping decorated function.
@@ -49,31 +70,16 @@ def handle_gateways(filter_index: int = None, data_index: Union[int, List[int]]
             :param kwargs: Arbitrary keyword arguments.
             :return: Result of wrapped function.
             """
-            if not skip:
-                res = None
-                if len(args) >= 2 and isinstance(args[0], EntityDataInterface):
-                    instance = args[0]
-                    entity_type = args[1]
-
-                    if instance.authorize(entity_type, kwargs.get("authorize")):
-                        if filter_index is not None:
-                            instance.obfuscate_filters(
-                                entity_type, args[filter_index], batch)
-                        if data_index is not None:
-                            if isinstance(data_index, int):
-                                data_index = [data_index]
-                            for index in data_index:
-                                instance.set_defaults(
-                                    entity_type, interface_method, args[index], batch)
-                                instance.obfuscate_entity_data(
-                                    entity_type, args[index], batch)
-
-                        res = instance.deobfuscate_entity_data(
-                            entity_type, func(*args, **kwargs), batch)
-                return res
-            else:
-                return func(*args, **kwargs)
-
+            try:
+                pipeline = args[0]._gateway_pipelines[(args[1], func_wrapper)]
+            except KeyError:
+                pipeline = args[0].compile_gateway_pipeline(
+                    args[1], func_wrapper)
+            except (IndexError, AttributeError):
+                return None
+            return func(*args, **kwargs) if pipeline is None else pipeline(args, kwargs)
+
+        func_wrapper._gateway_spec = gateway_spec
         return func_wrapper
 
     return decorator
@@ -113,8 +119,14 @@ class EntityDataInterface(ABC):
             }
         }
 
+        self.session_ttl = self._environment_profile.get("session_ttl", 3600.0)
+        self._sessions: Dict[str, Tuple[str, float]] = {}
+        self._sessions_lock = Lock()
+
         self._gateways = self._populate_gateway_barriers()
         self._defaults = self._populate_default_parsers()
+        self._gateway_pipelines = {}
+        self.compile_gateway_pipelines()
 
     """
     Initiation methods
@@ -161,10 +173,10 @@ class EntityDataInterface(ABC):
                 "#meta", {}).get("authorize")
             if obfuscate is not None:
                 gateways[entity_type]["obfuscate"] = environment_utility.get_lambda_function_from_string(
-                    obfuscate)
+                    obfuscate, LAMBDA_NAMESPACE)
             if deobfuscate is not None:
                 gateways[entity_type]["deobfuscate"] = environment_utility.get_lambda_function_from_string(
-                    deobfuscate)
+                    deobfuscate, LAMBDA_NAMESPACE)
             if authorize is not None:
                 gateways[entity_type]["authorize"] = authorize
         return gateways
@@ -181,50 +193,188 @@ class EntityDataInterface(ABC):
                 "delete": {}
             } for entity_type in self._entity_profiles
         }
+        self._batch_shared_defaults = {
+            entity_type: {
+                "post": set(),
+                "patch": set(),
+                "delete": set()
+            } for entity_type in self._entity_profiles
+        }
+        compiled_functions = {}
         for entity_type in self._entity_profiles:
             for key in [key for key in self._entity_profiles[entity_type]]:
                 for option in [opt for opt in ["post", "patch", "delete"] if
                                opt in self._entity_profiles[entity_type][key]]:
-                    argument_parsers[entity_type][option][key] = \
-                        self._entity_profiles[entity_type][key][option]
+                    function_string = self._entity_profiles[entity_type][key][option]
+                    if function_string not in compiled_functions:
+                        compiled_functions[function_string] = environment_utility.get_lambda_function_from_string(
+                            function_string, LAMBDA_NAMESPACE)
+                    argument_parsers[entity_type][option][key] = compiled_functions[function_string]
+                    if self._entity_profiles[entity_type][key].get("batch_shared", False):
+                        self._batch_shared_defaults[entity_type][option].add(
+                            key)
                 if self._entity_profiles[entity_type][key].get("key", False) and key not in self.cache["keys"][entity_type]:
                     self.cache["keys"][entity_type].append(key)
         return argument_parsers
 
+    def compile_gateway_pipelines(self) -> None:
+        """
+        Method for compiling gateway pipelines for all entity types and gateway-handled interfacing methods.
+        """
+        self._gateway_pipelines = {}
+        wrappers = {value for cls in type(self).__mro__ for value in vars(cls).values()
+                    if hasattr(value, "_gateway_spec")}
+        for entity_type in self._entity_profiles:
+            for wrapper in wrappers:
+                self.compile_gateway_pipeline(entity_type, wrapper)
+
+    def compile_gateway_pipeline(self, entity_type: str, wrapper: Any) -> Optional[Callable]:
+        """
+        Method for compiling the gateway pipeline of an entity type and interfacing method.
+        Only stages, which are configured in the entity profile, are included.
+        :param entity_type: Entity type.
+        :param wrapper: Gateway-handled interfacing method, see 'handle_gateways'.
+        :return: Pipeline, taking the positional and keyword arguments of the interfacing method,
+            or None if no gateway is configured and the interfacing method can be called directly.
+        """
+        spec = wrapper._gateway_spec
+        func = spec["function"]
+        batch = spec["batch"]
+        gateways = self._gateways.get(entity_type, {})
+        defaults = self._defaults.get(entity_type, {}).get(spec["method"])
+        authorize = "authorize" in gateways
+        obfuscate_filters = spec["filter_index"] is not None and "obfuscate" in gateways
+        data_stages = [stage for stage in [
+            (lambda data: self.set_defaults(entity_type, spec["method"], data, batch)) if defaults else None,
+            (lambda data: self.obfuscate_entity_data(entity_type, data, batch)) if "obfuscate" in gateways else None
+        ] if stage is not None] if spec["data_indices"] else []
+        deobfuscate = "deobfuscate" in gateways
+
+        if not (authorize or obfuscate_filters or data_stages or deobfuscate):
+            pipeline = None
+        else:
+            def pipeline(args: tuple, kwargs: dict) -> Any:
+                """
+                Gateway pipeline.
+                :param args: Arguments of the interfacing method.
+                :param kwargs: Keyword arguments of the interfacing method.
+                :return: Result of the interfacing method.
+                """
+                if authorize and not self.authorize(entity_type, kwargs.get("authorize"), kwargs.get("session_token")):
+                    return None
+                if obfuscate_filters:
+                    self.obfuscate_filters(
+                        entity_type, args[spec["filter_index"]], batch)
+                if data_stages:
+                    args = list(args)
+                    for index in spec["data_indices"]:
+                        if index < len(args) and args[index] is not None:
+                            for stage in data_stages:
+                                args[index] = stage(args[index])
+                result = func(*args, **kwargs)
+                return self.deobfuscate_entity_data(entity_type, result, batch) if deobfuscate else result
+
+        self._gateway_pipelines[(entity_type, wrapper)] = pipeline
+        return pipeline
+
     """
     Gateway methods
     """
 
-    def authorize(self, entity_type: str, password: str) -> bool:
+    def refresh_gateways(self) -> None:
+        """
+        Method for refreshing gateways, defaults and gateway pipelines after entity profiles were changed.
+        Sessions are invalidated, since authorization configurations might have changed.
+        """
+        self._gateways = self._populate_gateway_barriers()
+        self._defaults = self._populate_default_parsers()
+        self.compile_gateway_pipelines()
+        self.invalidate_sessions()
+
+    def authenticate(self, entity_type: str, password: str, ttl: float = None) -> Optional[str]:
+        """
+        Method for authenticating for an entity type and opening a session.
+        :param entity_type: Entity type.
+        :param password: Authorization password.
+        :param ttl: Time in seconds, after which the session expires.
+            Defaults to None in which case the session TTL of the environment profile (or one hour) is used.
+        :return: Opaque session token, if authentication was successful, else None.
+        """
+        if not self.authorize(entity_type, password):
+            return None
+        token = secrets.token_urlsafe(32)
+        now = monotonic()
+        with self._sessions_lock:
+            for expired_token in [key for key in self._sessions if self._sessions[key][1] <= now]:
+                self._sessions.pop(expired_token)
+            self._sessions[token] = (
+                entity_type, now + (self.session_ttl if ttl is None else ttl))
+        return token
+
+    def invalidate_sessions(self, entity_type: str = None, token: str = None) -> None:
+        """
+        Method for invalidating sessions.
+        :param entity_type: Entity type to invalidate sessions for.
+            Defaults to None in which case sessions for all entity types are invalidated.
+        :param token: Session token to invalidate.
+            Defaults to None in which case all sessions of the entity type(s) are invalidated.
+        """
+        with self._sessions_lock:
+            if token is not None:
+                self._sessions.pop(token, None)
+            elif entity_type is None:
+                self._sessions.clear()
+            else:
+                for session_token in [key for key in self._sessions if self._sessions[key][0] == entity_type]:
+                    self._sessions.pop(session_token)
+
+    def authorize(self, entity_type: str, password: str = None, session_token: str = None) -> bool:
         """
         Method for checking authorized access to an entity type.
+        Session tokens are checked without hashing, see 'authenticate'.
         :param entity_type: Entity type.
         :param password: Authorization password.
+            Defaults to None.
+        :param session_token: Session token.
+            Defaults to None.
         :return: Authorization status.
         """
-        return "authorize" not in self._gateways[entity_type] or get_authorization_token(password) == self._gateways[entity_type]("authorize")
+        if "authorize" not in self._gateways.get(entity_type, {}):
+            return True
+        if session_token is not None:
+            session = self._sessions.get(session_token)
+            if session is not None and session[0] == entity_type:
+                if monotonic() < session[1]:
+                    return True
+                self.invalidate_sessions(token=session_token)
+        return password is not None and secrets.compare_digest(
+            get_authorization_token(password), self._gateways[entity_type]["authorize"])
 
     def set_defaults(self, entity_type: str, method_type: str, data: Union[list, dict, Any], batch: bool = False) \
-            -> None:
+            -> Union[list, dict, Any]:
         """
         Method for setting default value.
+        Defaults of attributes, flagged as "batch_shared", are calculated once per call, so that e.g. all entries of a batch share the same timestamp.
         :param entity_type: Entity type.
         :param method_type: Method type out of 'post', 'patch' and 'delete'
         :param data: Data to set standard values for.
         :param batch: Flag, declaring whether data contains multiple entries. Defaults to False.
-        """
-        if self._defaults[entity_type].get(method_type, False):
-            if isinstance(data, dict):
-                for key in self._defaults[entity_type][method_type]:
-                    data[key] = self._defaults[entity_type][method_type][key](
-                        data)
-            elif not batch:
-                for key in self._defaults[entity_type][method_type]:
-                    setattr(
-                        data, key, self._defaults[entity_type][method_type][key](data))
-            else:
-                for data_entry in data:
-                    self.set_defaults(entity_type, data_entry, data_entry)
+        :return: Data with default values.
+        """
+        defaults = self._defaults.get(entity_type, {}).get(method_type)
+        if defaults:
+            shared_values = {key: defaults[key](None)
+                             for key in self._batch_shared_defaults[entity_type][method_type]}
+            for entry in (data if batch else [data]):
+                if isinstance(entry, dict):
+                    for key in defaults:
+                        entry[key] = shared_values[key] if key in shared_values else defaults[key](
+                            entry)
+                else:
+                    for key in defaults:
+                        setattr(entry, key, shared_values[key] if key in shared_values else defaults[key](
+                            entry))
+        return data
 
     def obfuscate_filters(self, entity_type: str, filters: Union[List[FilterMask], List[List[FilterMask]]], batch: bool = False) -> None:
         """
@@ -233,7 +383,7 @@ class EntityDataInterface(ABC):
         :param filters: List of FilterMasks or list of lists of FilterMasks in case of batch filtering.
         :param batch: Flag, declaring whether filters contain multiple entries. Defaults to False.
         """
-        if "obfuscate" in self._gateways[entity_type] and filters:
+        if "obfuscate" in self._gateways.get(entity_type, {}) and filters:
             if not batch:
                 for filtermask in filters:
                     filtermask.transform(
@@ -242,33 +392,35 @@ class EntityDataInterface(ABC):
                 for filter_list in filters:
                     self.obfuscate_filters(entity_type, filter_list)
 
-    def obfuscate_entity_data(self, entity_type: str, data: Union[dict, list, Any], batch: bool = False) -> None:
+    def obfuscate_entity_data(self, entity_type: str, data: Union[dict, list, Any], batch: bool = False) -> Union[dict, list, Any]:
         """
         Method for obfuscating entity data.
         :param entity_type: Entity type.
         :param data: Entity data or list of entity data entries.
         :param batch: Flag, declaring whether data contains multiple entries. Defaults to False.
+        :return: Obfuscated entity data.
         """
-        if "obfuscate" in self._gateways[entity_type] and data:
+        if "obfuscate" in self._gateways.get(entity_type, {}) and data:
             if batch:
-                for entry in data:
-                    self.obfuscate_entity_data(entity_type, entry)
+                return [self.obfuscate_entity_data(entity_type, entry) for entry in data]
             else:
-                data = self._gateways[entity_type]["obfuscate"](data)
+                return self._gateways[entity_type]["obfuscate"](data)
+        return data
 
-    def deobfuscate_entity_data(self, entity_type: str, data: Union[dict, list, Any], batch: bool = False) -> None:
+    def deobfuscate_entity_data(self, entity_type: str, data: Union[dict, list, Any], batch: bool = False) -> Union[dict, list, Any]:
         """
         Method for deobfuscating data.
         :param entity_type: Entity type.
         :param data: Entity data or list of entity data entries.
         :param batch: Flag, declaring whether data contains multiple entries. Defaults to False.
+        :return: Deobfuscated entity data.
         """
-        if "deobfuscate" in self._gateways[entity_type] and data:
+        if "deobfuscate" in self._gateways.get(entity_type, {}) and data:
             if batch:
-                for entry in data:
-                    self.deobfuscate_entity_data(entity_type, entry)
+                return [self.deobfuscate_entity_data(entity_type, entry) for entry in data]
             else:
-                data = self._gateways[entity_type]["deobfuscate"](data)
+                return self._gateways[entity_type]["deobfuscate"](data)
+        return data
 
     def filters_from_data(self, entity_type: str, data: Any) -> list:
         """
@@ -322,6 +474,19 @@ class EntityDataInterface(ABC):
                for filtermasks in filters]
         return [entry for entry in res if res is not None]
 
+    def iter_get(self, entity_type: str, filters: List[List[FilterMask]], chunk_size: int = 1000, **kwargs: Optional[Any]) -> Iterator[Any]:
+        """
+        Method for iterating over entities.
+        Backends without streaming support fetch all entities at once.
+        :param entity_type: Entity type.
+        :param filters: A list of lists of Filtermasks declaring constraints.
+        :param chunk_size: Number of entities to fetch at once.
+            Defaults to 1000.
+        :param kwargs: Arbitrary keyword arguments.
+        :return: Iterator over target entities.
+        """
+        yield from self._get_batch(entity_type, filters, **kwargs) or []
+
     def get(self, batch: bool, *args: Optional[Any], **kwargs: Optional[Any]) -> Optional[Any]:
         """
         Method for acquring entities.
@@ -329,12 +494,15 @@ class EntityDataInterface(ABC):
         :param args: Arbitrary arguments.
         :param kwargs: Arbitrary keyword arguments.
             'mode': Overwrite class flag for handling entities via modes "as_object", "as_dict".
+            'stream': Flag, declaring whether to return an iterator over entities in case of batch-operations, see 'iter_get'.
         :return: Target entities.
         """
-        if batch:
-            self._get_batch(*args, **kwargs)
+        if batch and kwargs.pop("stream", False):
+            return self.iter_get(*args, **kwargs)
+        elif batch:
+            return self._get_batch(*args, **kwargs)
         else:
-            self._get(*args, **kwargs)
+            return self._get(*args, **kwargs)
 
     @abstractmethod
     @handle_gateways(filter_index=None, data_index=2, skip=False)
@@ -8,7 +8,7 @@
 # In-depth documentation can be found under utility/docs/entity_data_interfaces.md
 import copy
 from typing import Union, Any, List
-from . import dictionary_utility
+from ..bronze import dictionary_utility
 from ..bronze.comparison_utility import COMPARISON_METHOD_DICTIONARY as CMD
 
 
@@ -104,8 +104,8 @@ class FilterMask(object):
         self.deep = deep
         self.relative = relative
         self.reference = reference
-        self.add_filter_expressions(expressions)
         self.set_operator_dictionary(operator_dictionary)
+        self.add_filter_expressions(expressions)
 
     def add_filter_expressions(self, expressions: list) -> None:
         """
@@ -7,8 +7,13 @@
 """
 # In-depth documentation can be found under utility/docs/entity_data_interfaces.md
 import copy
-from sqlalchemy import and_, or_, not_
-from typing import Optional, Any, List, Union
+import json
+import base64
+import datetime
+from itertools import islice
+from sqlalchemy import and_, or_, not_, insert, inspect
+from sqlalchemy.orm import defer, undefer
+from typing import Optional, Any, List, Union, Iterator, Tuple
 from ..bronze import sqlalchemy_utility
 from .filter_mask import FilterMask
 from ..bronze.dictionary_utility import get_filter_depth
@@ -28,7 +33,12 @@ SQLALCHEMY_FILTER_CONVERTER = {
     "has": lambda x, y: x.contains(y),
     "not_has": lambda x, y: not_(x.contains(y)),
     "in": lambda x, y: x.in_(y),
-    "not_in": lambda x, y: not_(x.in_(y))
+    "not_in": lambda x, y: not_(x.in_(y)),
+    "<": lambda x, y: x < y,
+    "<=": lambda x, y: x <= y,
+    ">": lambda x, y: x > y,
+    ">=": lambda x, y: x >= y,
+    "startswith": lambda x, y: x.startswith(y, autoescape=True)
 }
 
 # Dictionary, defining table for manual linking
@@ -57,6 +67,41 @@ MANUAL_LINKAGE = {
 }
 
 
+def encode_cursor(order_keys: List[Tuple[str, bool]], values: List[Any]) -> str:
+    """
+    Function for encoding a pagination cursor.
+    :param order_keys: List of tuples of ordering attribute and descending flag.
+    :param values: Values of the ordering attributes of the last entity on the page.
+    :return: Opaque cursor.
+    """
+    encoded_values = [{"datetime": value.isoformat()} if isinstance(value, datetime.datetime) else
+                      {"date": value.isoformat()} if isinstance(value, datetime.date) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps({"order": order_keys, "values": encoded_values}).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str, order_keys: List[Tuple[str, bool]]) -> List[Any]:
+    """
+    Function for decoding a pagination cursor.
+    :param cursor: Opaque cursor.
+    :param order_keys: List of tuples of ordering attribute and descending flag, the cursor is expected to be created with.
+    :return: Values of the ordering attributes of the last entity on the previous page.
+    :raises ValueError: If the cursor is malformed or was created with a different ordering.
+    """
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        if not isinstance(data, dict) or not isinstance(data.get("order", []), list) or not isinstance(data.get("values", []), list):
+            raise ValueError("cursor data is not an object with ordering and values")
+        order = [tuple(order_key) for order_key in data.get("order", [])]
+        values = [datetime.datetime.fromisoformat(value["datetime"]) if isinstance(value, dict) and "datetime" in value else
+                  datetime.date.fromisoformat(value["date"]) if isinstance(value, dict) and "date" in value else value
+                  for value in data.get("values", [])]
+    except (TypeError, ValueError, UnicodeError) as ex:
+        raise ValueError(f"Malformed cursor: {ex}")
+    if order != [tuple(order_key) for order_key in order_keys] or len(values) != len(order_keys):
+        raise ValueError("Cursor was created with a different ordering.")
+    return values
+
+
 class SQLAlchemyEntityInterface(EntityDataInterface):
     """
     Class, representing SQLAlchemy Entity Interface.
@@ -74,7 +119,8 @@ class SQLAlchemyEntityInterface(EntityDataInterface):
         super().__init__(environment_profile, entity_profiles, linkage_profiles, view_profiles)
         self.engine = sqlalchemy_utility.get_engine(environment_profile["arguments"]["database"],
                                                     encoding=environment_profile["arguments"].get("encoding", "utf-8"))
-        self.base = sqlalchemy_utility.get_automapped_base(self.engine)
+        self.base = sqlalchemy_utility.get_automapped_base(
+            self.engine, self.get_schemas())
         self.model = sqlalchemy_utility.get_classes_from_base(self.base)
         self.session_factory = None
 
@@ -90,15 +136,43 @@ class SQLAlchemyEntityInterface(EntityDataInterface):
         global MANUAL_LINKAGE
         self._entity_profiles["MANUAL_LINKAGE"] = MANUAL_LINKAGE
 
+        # add columns and indices, which were added to profiles after the tables were created, and reflect them
+        added_columns = {entity_type: sqlalchemy_utility.add_missing_columns(
+            self.engine, entity_type, {**self._entity_profiles[entity_type], **self.get_foreign_key_columns(entity_type)},
+            self._entity_profiles[entity_type].get("#meta", {}).get("schema")) for entity_type in self._entity_profiles}
+        if any(added_columns.values()):
+            self.base = sqlalchemy_utility.get_automapped_base(
+                self.engine, self.get_schemas())
+            self.model = sqlalchemy_utility.get_classes_from_base(self.base)
+
         # add dataclasses, based off of with schema args enriched profiles, to model
         for profile in [p for p in self._entity_profiles if p not in self.model]:
             self._create_dataclass(profile)
 
-        # create infrastructure and define session factory
+        # create infrastructure, map added dataclasses and define session factory
         self.base.metadata.create_all(self.engine)
+        sqlalchemy_utility.map_added_classes(self.base)
         self.session_factory = sqlalchemy_utility.get_session_factory(
             self.engine)
 
+    def get_foreign_key_columns(self, entity_type: str) -> dict:
+        """
+        Method for getting the foreign key columns, which foreign key linkages add to the given entity type.
+        :param entity_type: Entity type.
+        :return: Column data dictionary.
+        """
+        return {f"{linkage['source']}_{linkage['source_key'][1]}": {"type": linkage["source_key"][0]}
+                for linkage in (self._linkage_profiles or {}).values()
+                if linkage["linkage_type"] == "foreign_key" and linkage["target"] == entity_type}
+
+    def get_schemas(self) -> List[str]:
+        """
+        Method for getting the schemas of the entity profiles.
+        :return: Schemas.
+        """
+        return sorted({self._entity_profiles[entity_type].get("#meta", {}).get("schema") for entity_type in self._entity_profiles
+                       if self._entity_profiles[entity_type].get("#meta", {}).get("schema")})
+
     def _create_dataclass(self, entity_type: str) -> None:
         """
         Internal method for creating dataclass for the given entity type.
@@ -106,9 +180,12 @@ class SQLAlchemyEntityInterface(EntityDataInterface):
         """
         mapping_profile = copy.deepcopy(
             {key: {"type": self._entity_profiles[entity_type][key]["type"],
+                   "deferred": self._entity_profiles[entity_type][key].get("deferred", False),
                    "schema_args": {
-                       "primary_key": self._entity_profiles[entity_type][key].get("primary_key", False),
+                       "primary_key": self._entity_profiles[entity_type][key].get(
+                           "primary_key", self._entity_profiles[entity_type][key].get("key", False)),
                        "nullable": not self._entity_profiles[entity_type][key].get("not_null", False),
+                       "index": self._entity_profiles[entity_type][key].get("index", False),
                        "comment": self._entity_profiles[entity_type][key].get("description", ""),
             }} for key in
                 self._entity_profiles[entity_type] if
@@ -129,7 +206,7 @@ class SQLAlchemyEntityInterface(EntityDataInterface):
                 mapping_profile[key]["schema_args"]["autoincrement"] = mapping_profile[key]["autoincrement"]
             if "unique" in mapping_profile[key]:
                 mapping_profile[key]["schema_args"]["unique"] = mapping_profile[key]["unique"]
-        self.model[entity_type] = sqlalchemy_utility.create_mapping_for_dictionary(self.base, entity_type, mapping_profile,
+        self.model[entity_type] = sqlalchemy_utility.create_mapping_from_dictionary(self.base, entity_type, mapping_profile,
                                                                                    self._linkage_profiles)
 
     """
@@ -150,6 +227,85 @@ class SQLAlchemyEntityInterface(EntityDataInterface):
                                                     exp[2]) for exp in filtermask.expressions])
         return filter_expressions
 
+    def convert_filter_lists(self, entity_type: str, list_of_filters: List[List[FilterMask]]) -> list:
+        """
+        Method for converting lists of FilterMasks to SQLAlchemy-filter expressions.
+        Entities need to match all FilterMasks of at least one of the lists.
+        :param entity_type: Entity type.
+        :param list_of_filters: A list of lists of Filtermasks declaring constraints.
+        :return: Filter expressions, which are empty, if no constraints are given.
+        """
+        return [or_(*[and_(*self.convert_filters(entity_type, filters)) for filters in list_of_filters])] if list_of_filters else []
+
+    def get_query_targets(self, entity_type: str, attributes: List[str] = None) -> list:
+        """
+        Method for getting query targets.
+        :param entity_type: Entity type.
+        :param attributes: List of attributes to query.
+            Defaults to None in which case the full entity is queried.
+        :return: Query targets.
+        """
+        return [self.model[entity_type]] if not attributes else [getattr(self.model[entity_type], attribute) for attribute in attributes]
+
+    def get_loader_options(self, entity_type: str, undefer_attributes: List[str] = None) -> list:
+        """
+        Method for getting loader options for full entity queries.
+        Attributes, flagged as deferred in the entity profile, are deferred via query options,
+        so that they are also deferred for automapped classes of existing tables.
+        Mapped attributes are used instead of class attributes, which might be shadowed, e.g. "metadata".
+        :param entity_type: Entity type.
+        :param undefer_attributes: List of deferred attributes to load.
+            Defaults to None.
+        :return: Loader options.
+        """
+        undefer_attributes = undefer_attributes or []
+        mapped_attributes = inspect(self.model[entity_type]).attrs
+        return [defer(mapped_attributes[key].class_attribute) for key in self._entity_profiles[entity_type]
+                if key != "#meta" and self._entity_profiles[entity_type][key].get("deferred", False)
+                and key not in undefer_attributes and key in mapped_attributes] + [
+            undefer(mapped_attributes[attribute].class_attribute) for attribute in undefer_attributes]
+
+    def get_order_keys(self, entity_type: str, order_by: List[str] = None) -> List[Tuple[str, bool]]:
+        """
+        Method for getting a deterministic ordering.
+        The key attributes of the entity type are appended as tiebreakers.
+        :param entity_type: Entity type.
+        :param order_by: List of attributes to order by, prefixed with "-" for descending order.
+            Defaults to None in which case entities are ordered by their key attributes.
+        :return: List of tuples of ordering attribute and descending flag.
+        """
+        order_keys = [(attribute[1:], True) if attribute.startswith("-") else (attribute, False)
+                      for attribute in (order_by or [])]
+        key_attributes = self.cache["keys"].get(entity_type) or [
+            column.key for column in inspect(self.model[entity_type]).primary_key]
+        order_keys.extend([(attribute, False) for attribute in key_attributes
+                           if attribute not in [order_key[0] for order_key in order_keys]])
+        return order_keys
+
+    def get_order_targets(self, entity_type: str, order_keys: List[Tuple[str, bool]]) -> list:
+        """
+        Method for getting ordering expressions.
+        :param entity_type: Entity type.
+        :param order_keys: List of tuples of ordering attribute and descending flag.
+        :return: Ordering expressions.
+        """
+        return [getattr(self.model[entity_type], attribute).desc() if descending else getattr(self.model[entity_type], attribute).asc()
+                for attribute, descending in order_keys]
+
+    def get_seek_filter(self, entity_type: str, order_keys: List[Tuple[str, bool]], values: List[Any]) -> Any:
+        """
+        Method for getting a filter expression, selecting entities after given ordering values (keyset pagination).
+        :param entity_type: Entity type.
+        :param order_keys: List of tuples of ordering attribute and descending flag.
+        :param values: Values of the ordering attributes of the last entity on the previous page.
+        :return: Filter expression.
+        """
+        columns = [getattr(self.model[entity_type], attribute)
+                   for attribute, _ in order_keys]
+        return or_(*[and_(*[columns[previous] == values[previous] for previous in range(index)],
+                          columns[index] < values[index] if order_keys[index][1] else columns[index] > values[index])
+                     for index in range(len(order_keys))])
+
     """
     Interfacing methods
     """
@@ -177,16 +333,109 @@ class SQLAlchemyEntityInterface(EntityDataInterface):
         :param entity_type: Entity type.
         :param filters: A list of lists of Filtermasks declaring constraints.
         :param kwargs: Arbitrary keyword arguments.
+            'attributes': List of attributes to fetch instead of full entity objects.
+            'undefer': List of deferred attributes to load with full entity objects.
+            'order_by': List of attributes to order by, prefixed with "-" for descending order.
+            'limit': Maximum number of entities to fetch.
         :return: Target entities.
         """
-        converted_filters = [
-            or_(*self.convert_filters(entity_type, filters)) for filters in list_of_filters]
         with self.session_factory() as session:
-            result = session.query(self.model[entity_type]).filter(or_(
-                *converted_filters)
-            ).all()
+            query = session.query(*self.get_query_targets(entity_type, kwargs.get("attributes"))).filter(
+                *self.convert_filter_lists(entity_type, list_of_filters)
+            )
+            if not kwargs.get("attributes"):
+                query = query.options(
+                    *self.get_loader_options(entity_type, kwargs.get("undefer")))
+            if kwargs.get("order_by"):
+                query = query.order_by(
+                    *self.get_order_targets(entity_type, self.get_order_keys(entity_type, kwargs["order_by"])))
+            if kwargs.get("limit") is not None:
+                query = query.limit(kwargs["limit"])
+            result = query.all()
         return result
 
+    def get_page(self, entity_type: str, list_of_filters: List[List[FilterMask]], page_size: int = 100, order_by: List[str] = None,
+                 cursor: str = None, **kwargs: Optional[Any]) -> Tuple[List[Any], Optional[str]]:
+        """
+        Method for acquiring a page of entities with keyset pagination.
+        Instead of skipping previous entities via offsets, the next page is selected by the ordering values of the last entity,
+        so that every page costs the same, given that the ordering attributes are indexed.
+        The key attributes of the entity type are appended to the ordering as tiebreakers.
+        Ordering attributes should not be nullable.
+        :param entity_type: Entity type.
+        :param list_of_filters: A list of lists of Filtermasks declaring constraints.
+        :param page_size: Maximum number of entities per page.
+            Defaults to 100.
+        :param order_by: List of attributes to order by, prefixed with "-" for descending order.
+            Defaults to None in which case entities are ordered by their key attributes.
+        :param cursor: Cursor of the previous page.
+            Defaults to None in which case the first page is returned.
+        :param kwargs: Arbitrary keyword arguments.
+            'attributes': List of attributes to fetch instead of full entity objects.
+                Missing ordering attributes are fetched additionally.
+        :return: Target entities and cursor of the next page, which is None for the last page.
+        :raises ValueError: If the cursor is malformed or was created with a different ordering.
+        """
+        if not self.authorize(entity_type, kwargs.get("authorize"), kwargs.get("session_token")):
+            return [], None
+        order_keys = self.get_order_keys(entity_type, order_by)
+        attributes = kwargs.get("attributes")
+        if attributes:
+            attributes = list(attributes) + [attribute for attribute, _ in order_keys
+                                             if attribute not in attributes]
+        self.obfuscate_filters(entity_type, list_of_filters, True)
+        filter_expressions = self.convert_filter_lists(
+            entity_type, list_of_filters)
+        if cursor is not None:
+            filter_expressions.append(self.get_seek_filter(
+                entity_type, order_keys, decode_cursor(cursor, order_keys)))
+        with self.session_factory() as session:
+            result = session.query(*self.get_query_targets(entity_type, attributes)).filter(
+                *filter_expressions
+            ).order_by(*self.get_order_targets(entity_type, order_keys)).limit(page_size + 1).all()
+        next_cursor = None
+        if len(result) > page_size:
+            result = result[:page_size]
+            next_cursor = encode_cursor(
+                order_keys, [getattr(result[-1], attribute) for attribute, _ in order_keys])
+        return self.deobfuscate_entity_data(entity_type, result, True), next_cursor
+
+    # override
+    def iter_get(self, entity_type: str, list_of_filters: List[List[FilterMask]], chunk_size: int = 1000, **kwargs: Optional[Any]) -> Iterator[Any]:
+        """
+        Method for iterating over entities.
+        Entities are streamed from the database in chunks, so that memory usage does not depend on the number of entities.
+        Gateways are applied per chunk. The session is kept open until the iterator is exhausted or closed.
+        It is not taken from the thread-local session registry, so that other calls of the same thread do not close it.
+        :param entity_type: Entity type.
+        :param list_of_filters: A list of lists of Filtermasks declaring constraints.
+        :param chunk_size: Number of entities to fetch at once.
+            Defaults to 1000.
+        :param kwargs: Arbitrary keyword arguments.
+            'attributes': List of attributes to fetch instead of full entity objects.
+            'undefer': List of deferred attributes to load with full entity objects.
+            'order_by': List of attributes to order by, prefixed with "-" for descending order.
+        :return: Iterator over target entities.
+        """
+        if not self.authorize(entity_type, kwargs.get("authorize"), kwargs.get("session_token")):
+            return
+        self.obfuscate_filters(entity_type, list_of_filters, True)
+        with self.session_factory.session_factory() as session:
+            query = session.query(*self.get_query_targets(entity_type, kwargs.get("attributes"))).filter(
+                *self.convert_filter_lists(entity_type, list_of_filters)
+            )
+            if not kwargs.get("attributes"):
+                query = query.options(
+                    *self.get_loader_options(entity_type, kwargs.get("undefer")))
+            if kwargs.get("order_by"):
+                query = query.order_by(
+                    *self.get_order_targets(entity_type, self.get_order_keys(entity_type, kwargs["order_by"])))
+            result = iter(query.yield_per(chunk_size))
+            chunk = list(islice(result, chunk_size))
+            while chunk:
+                yield from self.deobfuscate_entity_data(entity_type, chunk, True)
+                chunk = list(islice(result, chunk_size))
+
     # override
     def get(self, batch: bool, *args: Optional[Any], **kwargs: Optional[Any]) -> Optional[Any]:
         """
@@ -195,12 +444,15 @@ class SQLAlchemyEntityInterface(EntityDataInterface):
         :param args: Arbitrary arguments.
         :param kwargs: Arbitrary keyword arguments.
             'mode': Overwrite class flag for handling entities via modes "as_object", "as_dict".
+            'stream': Flag, declaring whether to return an iterator over entities in case of batch-operations, see 'iter_get'.
         :return: Target entities.
         """
-        if batch:
-            self._get_batch(*args, **kwargs)
+        if batch and kwargs.pop("stream", False):
+            return self.iter_get(*args, **kwargs)
+        elif batch:
+            return self._get_batch(*args, **kwargs)
         else:
-            self._get(*args, **kwargs)
+            return self._get(*args, **kwargs)
 
     # override
     @handle_gateways(filter_index=None, data_index=2, skip=False)
@@ -223,11 +475,24 @@ class SQLAlchemyEntityInterface(EntityDataInterface):
     def _post_batch(self, entity_type: str, entities: List[Any], **kwargs: Optional[Any]) -> List[Any]:
         """
         Method for adding new entities.
+        Entities, given as dictionaries, are inserted in bulk with one transaction per chunk.
+        These entities are neither refreshed nor converted to objects and need to share the same keys.
         :param entity_type: Entity type.
-        :param entity: Entity objects.
+        :param entity: Entity objects or dictionaries.
         :param kwargs: Arbitrary keyword arguments.
+            'chunk_size': Number of entities to insert per transaction, if entities are given as dictionaries.
+                Defaults to 1000.
         :return: Target entities.
         """
+        if entities and isinstance(entities[0], dict):
+            chunk_size = kwargs.get("chunk_size", 1000)
+            with self.session_factory() as session:
+                for index in range(0, len(entities), chunk_size):
+                    session.execute(insert(self.model[entity_type]),
+                                    entities[index:index+chunk_size])
+                    session.commit()
+            return entities
+
         with self.session_factory() as session:
             for entity in entities:
                 session.add(entity)
@@ -276,12 +541,25 @@ class SQLAlchemyEntityInterface(EntityDataInterface):
     def _patch_batch(self, entity_type: str, entities: List[Any], patches: List[dict] = [], **kwargs: Optional[Any]) -> List[Any]:
         """
         Method for patching existing entities.
+        Entities, given as dictionaries, are updated in bulk by their keys with one transaction per chunk.
+        These entities need to contain the key attributes and are neither refreshed nor converted to objects.
         :param entity_type: Entity type.
-        :param entity: Entity objects to patch.
+        :param entity: Entity objects or dictionaries to patch.
         :param patches: Patches as dictionaries, if entities are not already patched.
         :param kwargs: Arbitrary keyword arguments.
+            'chunk_size': Number of entities to update per transaction, if entities are given as dictionaries.
+                Defaults to 1000.
         :return: Target entities.
         """
+        if entities and isinstance(entities[0], dict):
+            chunk_size = kwargs.get("chunk_size", 1000)
+            with self.session_factory() as session:
+                for index in range(0, len(entities), chunk_size):
+                    session.bulk_update_mappings(self.model[entity_type],
+                                                 entities[index:index+chunk_size])
+                    session.commit()
+            return entities
+
         if patches:
             for index, patch in enumerate(patches):
                 for key in patch:
@@ -43,13 +43,15 @@ def get_function_from_path(path: str, sha256: str = None) -> Any:
         return getattr(module, function_name)
 
 
-def get_lambda_function_from_string(function_string: str) -> Any:
+def get_lambda_function_from_string(function_string: str, namespace: dict = None) -> Any:
     """
     Function for loading and returning function from path.
     :param function_string: Lambda function as string.
+    :param namespace: Global namespace, the lambda function is evaluated in.
+        Defaults to None in which case the namespace of this module is used.
     :return: Loaded function.
     """
-    return eval(function_string)
+    return eval(function_string) if namespace is None else eval(function_string, namespace)
 
 
 def issue_multiple_tries(function, tries=3, *args, **kwargs) -> Any:
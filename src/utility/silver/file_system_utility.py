@@ -6,7 +6,7 @@
 ****************************************************
 """
 import os
-from typing import List
+from typing import List, Tuple, Iterator
 
 
 def create_folder_tree(root: str, structure: list) -> None:
@@ -56,16 +56,39 @@ def safely_create_path(path: str) -> None:
         os.makedirs(path)
 
 
+def walk_files(path: str, ignored_folders: List[str] = []) -> Iterator[os.DirEntry]:
+    """
+    Function for lazily walking all files (including nested files) under given directory.
+    Ignored folders are pruned before descending into them. Files of a folder are yielded before its subfolders are entered.
+    The yielded directory entries cache their stat results, so that calling 'stat()' costs at most one system call.
+    Unreadable folders are skipped.
+    :param path: Root path to start file search in.
+    :param ignored_folders: Names of folders to skip.
+        Defaults to an empty list.
+    :return: Iterator over directory entries of files.
+    """
+    folders = [path]
+    while folders:
+        subfolders = []
+        try:
+            with os.scandir(folders.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in ignored_folders:
+                            subfolders.append(entry.path)
+                    elif entry.is_file():
+                        yield entry
+        except OSError:
+            pass
+        folders.extend(reversed(subfolders))
+
+
 def get_all_files(path: str) -> List[str]:
     """
     Function for collecting all files (including nested files) under given directory.
     :param path: Root path to start file search in.
     """
-    file_list = []
-    for root, dirs, files in os.walk(path, topdown=True):
-        for file in files:
-            file_list.append(os.path.join(root, file))
-    return list(set(file_list))
+    return [entry.path for entry in walk_files(path)]
 
 
 def get_all_folders(path: str) -> List[str]:
@@ -78,3 +101,75 @@ def get_all_folders(path: str) -> List[str]:
         for folder in dirs:
             folder_list.append(os.path.join(root, folder))
     return list(set(folder_list))
+
+
+def get_file_fingerprint(file_path: str, stat_result: os.stat_result = None) -> Tuple[int, int, int, int]:
+    """
+    Function for getting a cheap fingerprint of a file, which changes if the file is replaced or modified.
+    :param file_path: File path.
+    :param stat_result: Stat result of the file.
+        Defaults to None in which case the file is stat'ed.
+    :return: Tuple of device, inode, size and modification time in nanoseconds.
+    """
+    stat_result = os.stat(file_path) if stat_result is None else stat_result
+    return stat_result.st_dev, stat_result.st_ino, stat_result.st_size, stat_result.st_mtime_ns
+
+
+def link_duplicate(source_path: str, duplicate_path: str, mode: str = "hardlink") -> os.stat_result:
+    """
+    Function for atomically replacing a duplicate file with a link to its source file on the same filesystem.
+    :param source_path: Source file path.
+    :param duplicate_path: Duplicate file path.
+    :param mode: Link mode: "hardlink" for sharing the same inode or "reflink" for a copy-on-write clone,
+        which is only supported by some filesystems (e.g. Btrfs, XFS) on Linux.
+        Defaults to "hardlink".
+    :return: Stat result of the replaced duplicate file.
+    :raises OSError: If the files are on different filesystems or the link mode is not supported.
+    """
+    temporary_path = duplicate_path + ".dedupe"
+    if mode == "hardlink":
+        os.link(source_path, temporary_path)
+    elif mode == "reflink":
+        import fcntl
+        # FICLONE ioctl request code from linux/fs.h
+        ficlone = 0x40049409
+        try:
+            with open(source_path, "rb") as source_file, open(temporary_path, "wb") as temporary_file:
+                fcntl.ioctl(temporary_file.fileno(), ficlone, source_file.fileno())
+        except OSError:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+            raise
+    else:
+        raise ValueError(f"Unsupported link mode '{mode}'.")
+    os.replace(temporary_path, duplicate_path)
+    return os.stat(duplicate_path)
+
+
+def get_folder_snapshot(path: str, ignored_folders: List[str] = []) -> dict:
+    """
+    Function for getting a snapshot of all files (including nested files) under given directory.
+    :param path: Root path to take snapshot of.
+    :param ignored_folders: Names of folders to skip.
+        Defaults to an empty list.
+    :return: Dictionary, mapping file paths to file fingerprints.
+    """
+    snapshot = {}
+    for entry in walk_files(path, ignored_folders):
+        try:
+            snapshot[entry.path] = get_file_fingerprint(
+                entry.path, entry.stat())
+        except FileNotFoundError:
+            pass
+    return snapshot
+
+
+def get_snapshot_changes(old_snapshot: dict, new_snapshot: dict) -> List[str]:
+    """
+    Function for getting paths of created, modified and removed files between two folder snapshots.
+    :param old_snapshot: Old folder snapshot.
+    :param new_snapshot: New folder snapshot.
+    :return: List of changed file paths.
+    """
+    return [path for path in new_snapshot if old_snapshot.get(path) != new_snapshot[path]] + \
+        [path for path in old_snapshot if path not in new_snapshot]
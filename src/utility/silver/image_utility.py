@@ -6,23 +6,32 @@
 ****************************************************
 """
 import os
-from PIL import Image
+import functools
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, ImageFile
 import logging
-from typing import Any, List, Optional
+from typing import Any, List, Optional, Tuple, Iterator
 LOGGER = logging.Logger("[ImageUtility]")
 
+# Image file extensions
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp", ".gif", ".bmp")
 
-def check_image_health(file_path: str) -> bool:
+
+def check_image_health(file_path: str, header_only: bool = False) -> bool:
     """
     Function for checking image file health.
     Taken from @https://github.com/ftarlao/check-media-integrity and adjusted.
     :param file_path: File path of image file to check.
+    :param header_only: Flag for only checking the image header without decoding image data.
+        Defaults to False.
     :return: True, if image file is healthy, else False.
     """
     try:
         if not os.path.exists(file_path):
             LOGGER.warn(f"Could not find '{file_path}'!")
             return False
+        if header_only:
+            return check_image_header(file_path)
         img = Image.open(file_path)
         img.verify()
         img.close()
@@ -34,3 +43,84 @@ def check_image_health(file_path: str) -> bool:
     except: 
         LOGGER.warn(f"'{file_path}' is corrupted!")
         return False
+
+
+def check_image_header(file_path: str) -> bool:
+    """
+    Function for quickly checking image file health by parsing the image header only.
+    Truncated or corrupted image data is not detected.
+    :param file_path: File path of image file to check.
+    :return: True, if image header is valid, else False.
+    """
+    try:
+        with Image.open(file_path) as img:
+            return img.width > 0 and img.height > 0
+    except Exception:
+        LOGGER.warn(f"'{file_path}' has no valid image header!")
+        return False
+
+
+def check_image_health_with_draft(file_path: str, draft_size: Tuple[int, int] = (128, 128)) -> bool:
+    """
+    Function for checking image file health by fully decoding the image data at reduced resolution, where the format
+    supports it (e.g. JPEG DCT scaling). Other formats are decoded at full resolution.
+    The function does not log, so that it can be used for checking large numbers of files.
+    :param file_path: File path of image file to check.
+    :param draft_size: Requested draft size.
+        Defaults to (128, 128).
+    :return: True, if image file is healthy, else False.
+    """
+    try:
+        with Image.open(file_path) as img:
+            img.draft(img.mode, draft_size)
+            img.load()
+        return True
+    except Exception:
+        return False
+
+
+def check_image_health_in_bulk(file_paths: List[str], workers: int = None, draft_size: Tuple[int, int] = (128, 128),
+                               chunk_size: int = 64) -> Iterator[Tuple[str, bool]]:
+    """
+    Function for checking the health of many image files on a process pool.
+    :param file_paths: File paths of image files to check.
+    :param workers: Number of worker processes.
+        Defaults to None in which case the CPU count is used.
+    :param draft_size: Requested draft size, see 'check_image_health_with_draft'.
+        Defaults to (128, 128).
+    :param chunk_size: Number of files, sent to a worker process at once.
+        Defaults to 64.
+    :return: Iterator of tuples of file path and health flag in the order of the given file paths.
+    """
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from zip(file_paths, executor.map(functools.partial(check_image_health_with_draft, draft_size=draft_size),
+                                                file_paths, chunksize=chunk_size))
+
+
+class StreamingImageValidator(object):
+    """
+    Class, representing an incremental image validator.
+    Image data is decoded as it arrives, so that images can be validated while they are downloaded.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initiation method.
+        """
+        self._parser = ImageFile.Parser()
+
+    def feed(self, data: bytes) -> None:
+        """
+        Method for feeding image data.
+        :param data: Next chunk of image data.
+        :raises OSError: If image data is corrupted.
+        """
+        self._parser.feed(data)
+
+    def close(self) -> Image.Image:
+        """
+        Method for finishing validation.
+        :return: Decoded image.
+        :raises OSError: If image data is truncated or could not be parsed.
+        """
+        return self._parser.close()
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""
+****************************************************
+*           aura-cognitive-architecture
+*            (c) 2023 Alexander Hering             *
+****************************************************
+"""
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from src.configuration.model_database_config import ENTITY_PROFILE
+from src.interfaces.model_database import ModelDatabase
+
+
+@pytest.fixture
+def model_database(tmp_path, monkeypatch):
+    """
+    Fixture for a model database in a temporary SQLite file.
+    """
+    monkeypatch.setenv("DB_URL", f"sqlite:///{tmp_path / 'model_database.db'}")
+    monkeypatch.setenv("DB_DIALECT", "sqlite")
+    schemas = {ENTITY_PROFILE[entity_type]["#meta"]["schema"] for entity_type in ENTITY_PROFILE
+               if ENTITY_PROFILE[entity_type].get("#meta", {}).get("schema")}
+
+    def attach_schemas(connection, _):
+        for schema in schemas:
+            connection.execute(
+                f"ATTACH DATABASE '{tmp_path / schema}.db' AS {schema}")
+
+    event.listen(Engine, "connect", attach_schemas)
+    try:
+        db = ModelDatabase()
+        db.initiate_infrastructure()
+        yield db
+        db.engine.dispose()
+    finally:
+        event.remove(Engine, "connect", attach_schemas)
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+****************************************************
+*           aura-cognitive-architecture
+*            (c) 2023 Alexander Hering             *
+****************************************************
+"""
+import os
+import base64
+import datetime
+import pytest
+from sqlalchemy import inspect, text
+from src.interfaces.model_database import ModelDatabase
+from src.utility.gold.sqlalchemy_entity_data_interface import encode_cursor, decode_cursor
+
+
+def test_deferred_metadata(model_database):
+    model_database.post(True, "model", [{"metadata": {"id": 1}, "normalized_metadata": {"name": "model"}}])
+    reopened_database = ModelDatabase()
+    reopened_database.initiate_infrastructure()
+
+    # Deferred attributes are neither loaded for declared nor for automapped classes, unless undeferred
+    for db in [model_database, reopened_database]:
+        assert "metadata" not in db.get(True, "model", [])[0].__dict__
+        assert next(db.get(True, "model", [], stream=True)).__dict__.get("metadata") is None
+        assert db.get(True, "model", [], undefer=["metadata"])[0].__dict__["metadata"] == {"id": 1}
+    reopened_database.engine.dispose()
+
+
+def test_folder_filters_match_prefixes(model_database, tmp_path):
+    model_folder = str(tmp_path / "models")
+    model_database.post(True, "model_file", [{"folder": folder, "file_name": "model.safetensors"} for folder in [
+        model_folder, os.path.join(model_folder, "lora"), f"{model_folder}_backup", os.path.join(str(tmp_path), "other", "models")]])
+    model_database.post(True, "asset", [{"type": "image", "path": os.path.join(folder, "preview.png")} for folder in [
+        model_folder, os.path.join(model_folder, "lora"), f"{model_folder}_backup"]])
+
+    assert sorted(model_file.folder for model_file in model_database.get_tracked_model_files(model_folder + os.sep)) == [
+        model_folder, os.path.join(model_folder, "lora")]
+    assert sorted(asset.path for asset in model_database.get_assets(folder=model_folder)) == [
+        os.path.join(model_folder, "lora", "preview.png"), os.path.join(model_folder, "preview.png")]
+
+
+def test_missing_columns_are_added(model_database):
+    with model_database.engine.begin() as connection:
+        connection.execute(text("DROP TABLE machine_learning_models.model_file"))
+        connection.execute(text("CREATE TABLE machine_learning_models.model_file (id INTEGER PRIMARY KEY, file_name VARCHAR)"))
+    migrated_database = ModelDatabase()
+    migrated_database.initiate_infrastructure()
+
+    inspector = inspect(migrated_database.engine)
+    assert {"sha256", "model_version_id"} <= {column["name"] for column in inspector.get_columns(
+        "model_file", schema="machine_learning_models")}
+    assert ["sha256"] in [index["column_names"] for index in inspector.get_indexes("model_file", schema="machine_learning_models")]
+    assert "sha256" in inspect(migrated_database.model["model_file"]).attrs
+    migrated_database.engine.dispose()
+
+
+def test_link_duplicate_model_files(model_database, tmp_path):
+    model_database.post(True, "model_file", [{"folder": str(tmp_path), "file_name": file_name, "sha256": "0" * 64}
+                                             for file_name in ["model.safetensors", "copy.safetensors"]])
+    model_files = model_database.get(True, "model_file", [])
+    model_version_data = {"source": "test", "api_url": "test/1", "metadata": {"name": "model"},
+                          "normalized_metadata": {"name": "model"}}
+    model_database.link_model_files([(model_file, model_version_data) for model_file in model_files])
+
+    model_versions = model_database.get(True, "model_version", [])
+    assert len(model_versions) == 1
+    assert [(model_file.status, model_file.model_version_id) for model_file in model_database.get(True, "model_file", [])] == [
+        ("linked", model_versions[0].id)] * 2
+
+
+def test_get_unlinked_model_files(model_database, tmp_path):
+    model_database.post(True, "model_file", [{"folder": str(tmp_path), "file_name": file_name, "sha256": file_name[0] * 64}
+                                             for file_name in ["linked.safetensors", "unlinked.safetensors"]])
+    model_database.link_model_files([(model_file, {"source": "test", "api_url": "test/1", "metadata": {},
+                                                   "normalized_metadata": {}})
+                                     for model_file in model_database.get_unlinked_model_files(["linked.safetensors"])])
+
+    assert [model_file.file_name for model_file in model_database.get_unlinked_model_files()] == ["unlinked.safetensors"]
+    assert model_database.get_unlinked_model_files(["linked.safetensors"]) == []
+
+
+@pytest.mark.parametrize("payload", [b"[]", b"1", b"null", b'"cursor"', b'{"order": 1, "values": []}',
+                                     b'{"order": [], "values": [{"datetime": 1}]}', b"{"])
+def test_decode_malformed_cursor(payload):
+    with pytest.raises(ValueError):
+        decode_cursor(base64.urlsafe_b64encode(payload).decode("ascii"), [("id", False)])
+
+
+def test_decode_cursor():
+    order_keys = [("created", True), ("id", False)]
+    created = datetime.datetime(2023, 1, 1, 12)
+    assert decode_cursor(encode_cursor(order_keys, [created, 1]), order_keys) == [created, 1]
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor(order_keys, [created, 1]), [("id", False)])
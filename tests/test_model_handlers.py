@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+****************************************************
+*           aura-cognitive-architecture
+*            (c) 2023 Alexander Hering             *
+****************************************************
+"""
+import os
+import datetime
+from time import time, sleep
+from threading import Event, Thread
+import pytest
+from sqlalchemy import update
+from src.interfaces.model_database import ModelDatabase
+from src.model.model_control.model_handlers import StabeDiffusionModelHandler
+
+
+@pytest.fixture
+def model_folder(tmp_path):
+    """
+    Fixture for a temporary model folder.
+    """
+    folder = tmp_path / "models"
+    (folder / "lora").mkdir(parents=True)
+    (folder / "checkpoint.safetensors").write_bytes(b"checkpoint" * 1024)
+    (folder / "lora" / "style.safetensors").write_bytes(b"style" * 1024)
+    (folder / "lora" / "notes.txt").write_text("not a model file")
+    return str(folder)
+
+
+@pytest.mark.parametrize("parallel", [False, True])
+def test_load_model_folder(model_database, model_folder, parallel):
+    handler = StabeDiffusionModelHandler(model_database, {})
+
+    report = handler.load_model_folder(model_folder, parallel=parallel, workers=2)
+    assert report == {"tracked": 2, "failed": 0}
+    tracked = {os.path.join(model_file.folder, model_file.file_name): model_file
+               for model_file in model_database.get_tracked_model_files(model_folder)}
+    assert set(tracked) == {os.path.join(model_folder, "checkpoint.safetensors"),
+                            os.path.join(model_folder, "lora", "style.safetensors")}
+    assert all(model_file.sha256 and model_file.quick_hash for model_file in tracked.values())
+
+    # Unchanged files are not hashed or tracked again
+    assert handler.load_model_folder(model_folder, parallel=parallel, workers=2) == {
+        "tracked": 0, "failed": 0}
+
+
+def test_load_model_folder_skips_unreadable_files(model_database, model_folder, monkeypatch):
+    handler = StabeDiffusionModelHandler(model_database, {})
+    unreadable = os.path.join(model_folder, "checkpoint.safetensors")
+    from src.model.model_control import model_handlers
+    hash_model_file = model_handlers.hash_model_file
+
+    def failing_hash_model_file(file_path, defer_full_hash=False):
+        if file_path == unreadable:
+            raise PermissionError(f"Permission denied: '{file_path}'")
+        return hash_model_file(file_path, defer_full_hash)
+
+    monkeypatch.setattr(model_handlers, "hash_model_file", failing_hash_model_file)
+    assert handler.load_model_folder(model_folder) == {"tracked": 1, "failed": 1}
+    assert [model_file.file_name for model_file in model_database.get_tracked_model_files(model_folder)] == [
+        "style.safetensors"]
+
+
+def test_load_model_folder_with_existing_database(model_database, model_folder):
+    StabeDiffusionModelHandler(model_database, {}).load_model_folder(model_folder)
+
+    # Reopened databases map existing tables via reflection
+    reopened_database = ModelDatabase()
+    reopened_database.initiate_infrastructure()
+    handler = StabeDiffusionModelHandler(reopened_database, {})
+    with open(os.path.join(model_folder, "checkpoint.safetensors"), "ab") as model_file:
+        model_file.write(b"changed")
+    assert handler.load_model_folder(model_folder) == {"tracked": 1, "failed": 0}
+    assert len(reopened_database.get_tracked_model_files(model_folder)) == 2
+    reopened_database.engine.dispose()
+
+
+class MetadataAPI(object):
+    """
+    Class, representing a metadata source with a known, a changed, a missing and an unreachable model version.
+    """
+
+    def parse_api_url(self, api_url):
+        return "id", api_url.split("/")[-1]
+
+    def resolve_metadata_batch(self, identifier, model_ids):
+        return {model_id: {"name": model_id.upper() if model_id == "changed" else model_id}
+                for model_id in model_ids if model_id in ["unchanged", "changed"]}, \
+            [model_id for model_id in model_ids if model_id == "missing"]
+
+    def normalize_metadata(self, metadata):
+        return {"name": metadata["name"]}
+
+
+def test_update_metadata(model_database):
+    outdated = datetime.datetime(2020, 1, 1)
+    model_ids = ["unchanged", "changed", "missing", "failed"]
+    model_database.post(True, "model_version", [{"source": "test", "api_url": f"test/{model_id}", "metadata": {"name": model_id},
+                                                 "normalized_metadata": {"name": model_id}} for model_id in model_ids])
+    # Update timestamps are set by the profile defaults, so that they are outdated directly
+    with model_database.engine.begin() as connection:
+        connection.execute(update(model_database.model["model_version"].__table__).values(updated=outdated))
+    handler = StabeDiffusionModelHandler(model_database, {"test": MetadataAPI()})
+
+    assert handler.update_metadata() == {
+        "checked": 4, "changed": 1, "unchanged": 1, "missing": 1, "failed": 1}
+    model_versions = {model_version.api_url.split("/")[-1]: model_version
+                      for model_version in model_database.get(True, "model_version", [])}
+    assert model_versions["changed"].normalized_metadata == {"name": "CHANGED"}
+    # Model versions, for which fetching failed, stay stale and are retried
+    assert [model_id for model_id in model_ids if model_versions[model_id].updated == outdated] == ["failed"]
+
+
+def test_request_asset_thumbnails(model_database, tmp_path, monkeypatch):
+    from PIL import Image
+    from src.model.model_control import thumbnail_caches
+    asset_paths = [str(tmp_path / f"preview_{index}.png") for index in range(3)]
+    for index, asset_path in enumerate(asset_paths):
+        Image.new("RGB", (300, 200), (index * 50, 0, 0)).save(asset_path)
+    model_database.post(True, "asset", [{"type": "image", "path": asset_path} for asset_path in asset_paths])
+    # Asset statuses are set by the profile defaults, so that they are updated directly
+    with model_database.engine.begin() as connection:
+        connection.execute(update(model_database.model["asset"].__table__).values(status="downloaded"))
+    saves = []
+    save = thumbnail_caches.json_utility.save
+    monkeypatch.setattr(thumbnail_caches.json_utility, "save",
+                        lambda data, path: saves.append(path) or save(data, path))
+    thumbnail_cache = thumbnail_caches.ThumbnailCache(str(tmp_path / "thumbnails"))
+    handler = StabeDiffusionModelHandler(model_database, {}, thumbnail_cache=thumbnail_cache)
+
+    thumbnails = handler.request_asset_thumbnails((64, 64))
+    assert all(os.path.exists(thumbnail.result()) for thumbnail in thumbnails.values())
+    # Newly calculated hashes are written back to the database and the source hash index is written once
+    assert all(asset.sha256 for asset in model_database.get_assets("image"))
+    assert len(saves) == 1
+    thumbnail_cache.shutdown()
+    assert len(saves) == 1
+
+
+def test_watch_model_folder(model_database, model_folder, monkeypatch):
+    handler = StabeDiffusionModelHandler(model_database, {})
+    index_builds = []
+    get_tracking_indices = handler._get_tracking_indices
+    monkeypatch.setattr(handler, "_get_tracking_indices",
+                        lambda *args: index_builds.append(args) or get_tracking_indices(*args))
+    stop_event = Event()
+    watcher = Thread(target=handler.watch_model_folder, args=(model_folder,), kwargs={
+        "poll_interval": 0.05, "settle_time": 0.0, "use_inotify": False, "stop_event": stop_event})
+    watcher.start()
+
+    def wait_for_tracked_paths(expected_paths):
+        deadline = time() + 10.0
+        while time() < deadline:
+            tracked_paths = {os.path.join(model_file.folder, model_file.file_name)
+                             for model_file in model_database.get_tracked_model_files(model_folder) if model_file.inactive != "X"}
+            if tracked_paths == expected_paths:
+                return True
+            sleep(0.05)
+        return False
+
+    try:
+        assert wait_for_tracked_paths({os.path.join(model_folder, "checkpoint.safetensors"),
+                                       os.path.join(model_folder, "lora", "style.safetensors")})
+        os.rename(os.path.join(model_folder, "checkpoint.safetensors"),
+                  os.path.join(model_folder, "lora", "checkpoint.safetensors"))
+        assert wait_for_tracked_paths({os.path.join(model_folder, "lora", "checkpoint.safetensors"),
+                                       os.path.join(model_folder, "lora", "style.safetensors")})
+        with open(os.path.join(model_folder, "added.safetensors"), "wb") as model_file:
+            model_file.write(b"added" * 1024)
+        os.remove(os.path.join(model_folder, "lora", "style.safetensors"))
+        assert wait_for_tracked_paths({os.path.join(model_folder, "lora", "checkpoint.safetensors"),
+                                       os.path.join(model_folder, "added.safetensors")})
+    finally:
+        stop_event.set()
+        watcher.join()
+    # Moved model files keep their record and the indices are only built by the initial load and the watch
+    assert len(model_database.get_tracked_model_files(model_folder)) == 3
+    assert len(index_builds) == 2